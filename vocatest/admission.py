@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 准入控制
+
+限制每个工作进程同时进行的测试数量，超出的测试按先来后到排队，
+前面的测试完成或超时后依次放行。进行中和排队中的数量可作为监控指标读取。
+排队中被放行的测试需要在 claim_ttl 秒内再次 request()/touch() 认领名额，
+否则（例如用户已关闭页面）名额立即释放给下一位。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# ==================== 常量配置 ====================
+DEFAULT_MAX_ACTIVE = 200        # 每个工作进程同时进行的最大测试数
+DEFAULT_ACTIVE_TTL = 30 * 60    # 进行中的测试超过该时间无操作即释放名额（秒）
+DEFAULT_QUEUE_TTL = 60          # 排队中的测试超过该时间未刷新即移出队列（秒）
+DEFAULT_CLAIM_TTL = 30          # 排队放行后未认领的名额保留时间（秒）
+
+# ==================== 核心类 - 准入控制 ====================
+class AdmissionController:
+    """线程安全的准入控制器（同一进程内所有会话共享）"""
+
+    def __init__(self, max_active=DEFAULT_MAX_ACTIVE, active_ttl=DEFAULT_ACTIVE_TTL,
+                 queue_ttl=DEFAULT_QUEUE_TTL, claim_ttl=DEFAULT_CLAIM_TTL):
+        self.max_active = max_active
+        self.active_ttl = active_ttl
+        self.queue_ttl = queue_ttl
+        self.claim_ttl = claim_ttl
+
+        self._lock = threading.Lock()
+        self._active = {}               # test_id -> 最后活动时间
+        self._queue = OrderedDict()     # test_id -> 最后刷新时间（按排队先后）
+        self._unclaimed = {}            # test_id -> 放行时间（排队放行后尚未认领的名额）
+        self._admitted_total = 0
+        self._completed_total = 0
+        self._expired_total = 0
+
+    def request(self, test_id):
+        """
+        申请或刷新测试名额
+        返回：(是否已放行, 排队位置)，已放行时排队位置为 0
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+
+            if test_id in self._active:
+                self._active[test_id] = now
+                self._unclaimed.pop(test_id, None)
+                return True, 0
+
+            # 已在队列中的只更新刷新时间，不改变排队顺序
+            self._queue[test_id] = now
+            self._promote(now)
+
+            if test_id in self._active:
+                self._unclaimed.pop(test_id, None)
+                return True, 0
+            return False, self._position(test_id)
+
+    def touch(self, test_id):
+        """
+        记录进行中测试的活动（不会放行新的测试，未占用名额的测试需通过 request() 申请）
+        返回：该测试是否仍占用名额
+        """
+        now = time.monotonic()
+        with self._lock:
+            # 先释放已超时的名额，超时的测试不会因这次活动重新占用名额
+            self._expire(now)
+            if test_id not in self._active:
+                return False
+            self._active[test_id] = now
+            self._unclaimed.pop(test_id, None)
+            return True
+
+    def release(self, test_id):
+        """测试完成或放弃时释放名额"""
+        with self._lock:
+            if self._active.pop(test_id, None) is not None:
+                self._completed_total += 1
+            self._unclaimed.pop(test_id, None)
+            self._queue.pop(test_id, None)
+            # 先移除不再刷新的排队，避免把名额放行给已离开的用户
+            self._expire(time.monotonic())
+
+    def metrics(self):
+        """返回进行中、排队中等监控指标"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                'active': len(self._active),
+                'queued': len(self._queue),
+                'unclaimed': len(self._unclaimed),
+                'max_active': self.max_active,
+                'admitted_total': self._admitted_total,
+                'completed_total': self._completed_total,
+                'expired_total': self._expired_total,
+            }
+
+    def _promote(self, now):
+        """有空余名额时按顺序放行排队中的测试"""
+        while self._queue and len(self._active) < self.max_active:
+            test_id, _ = self._queue.popitem(last=False)
+            self._active[test_id] = now
+            self._unclaimed[test_id] = now
+            self._admitted_total += 1
+
+    def _expire(self, now):
+        """释放长时间无操作或放行后未认领的名额，移除不再刷新的排队"""
+        for test_id, promoted_at in list(self._unclaimed.items()):
+            if now - promoted_at > self.claim_ttl:
+                del self._unclaimed[test_id]
+                self._active.pop(test_id, None)
+                self._expired_total += 1
+        for test_id, last_seen in list(self._active.items()):
+            if now - last_seen > self.active_ttl:
+                del self._active[test_id]
+                self._unclaimed.pop(test_id, None)
+                self._expired_total += 1
+        for test_id, last_seen in list(self._queue.items()):
+            if now - last_seen > self.queue_ttl:
+                del self._queue[test_id]
+        self._promote(now)
+
+    def _position(self, test_id):
+        for position, queued_id in enumerate(self._queue, 1):
+            if queued_id == test_id:
+                return position
+        return 0
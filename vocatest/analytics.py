@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 增量统计汇总
+
+每保存一条测试结果就增量更新以下汇总表，管理页面只读取汇总表，
+查询耗时与历史结果数量无关：
+- daily_counts：每日测试数、词汇量与正确率之和
+- daily_levels：每日最终难度分布
+- vocabulary_histogram：词汇量分段直方图
+- level_accuracy：各难度等级的作答题数、答对数和掌握度之和（只计入作答过该等级的测试）
+- question_stats：每道题的作答数和答对数
+
+已有的结果 CSV 可以用一次性回填任务导入：
+    python analytics.py backfill vocabulary_test_results.csv
+"""
+
+import argparse
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# ==================== 常量配置 ====================
+DEFAULT_DB_FILE = "vocabulary_test_analytics.db"        # 汇总表数据库
+DEFAULT_RESULTS_FILE = "vocabulary_test_results.csv"    # 回填使用的结果文件
+VOCABULARY_BUCKET_SIZE = 1000   # 词汇量直方图分段宽度
+BACKFILL_CHUNKSIZE = 50000      # 回填时每块读取的行数
+LEVELS = range(1, 6)
+# 可由结果 CSV 重建的汇总表（question_stats 需要逐题记录，回填时保留）
+CSV_ROLLUP_TABLES = ('daily_counts', 'daily_levels', 'vocabulary_histogram', 'level_accuracy')
+# level_accuracy 的数据来源：逐题统计的新结果 / 由结果 CSV 估算的回填数据
+SOURCE_LIVE = "live"
+SOURCE_BACKFILL = "backfill"
+ALL_ROLLUP_TABLES = CSV_ROLLUP_TABLES + ('question_stats',)
+
+# ==================== 核心类 - 汇总表存储 ====================
+class AnalyticsStore:
+    """SQLite 汇总表，每个线程使用自己的连接"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    day TEXT PRIMARY KEY,
+                    tests INTEGER NOT NULL,
+                    vocabulary_sum REAL NOT NULL,
+                    accuracy_sum REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS daily_levels (
+                    day TEXT NOT NULL,
+                    level INTEGER NOT NULL,
+                    tests INTEGER NOT NULL,
+                    PRIMARY KEY (day, level)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS vocabulary_histogram (
+                    bucket INTEGER PRIMARY KEY,
+                    tests INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS level_accuracy (
+                    level INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    tests INTEGER NOT NULL,
+                    attempted INTEGER NOT NULL,
+                    correct INTEGER NOT NULL,
+                    mastery_sum REAL NOT NULL,
+                    PRIMARY KEY (level, source)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS question_stats (
+                    question_id TEXT PRIMARY KEY,
+                    attempts INTEGER NOT NULL,
+                    correct INTEGER NOT NULL
+                ) WITHOUT ROWID;
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- 写入 ----------
+    def record_result(self, results):
+        """把一条 calculate_test_results() 结果计入汇总表"""
+        # 自适应测试通常只经过 2-3 个等级，只计入实际作答过的等级
+        level_stats = {
+            level: results['difficulty_stats'][level]
+            for level in LEVELS if results['difficulty_stats'][level]['total'] > 0
+        }
+        question_counts = {}
+        for ans in results.get('answers', []):
+            attempts, correct = question_counts.get(ans['question_id'], (0, 0))
+            question_counts[ans['question_id']] = (attempts + 1, correct + int(bool(ans['is_correct'])))
+
+        with self._connect() as conn:
+            self._apply(
+                conn,
+                day=results['test_date'][:10],
+                total_vocabulary=results['total_vocabulary'],
+                accuracy=results['accuracy'],
+                final_difficulty=results['final_difficulty'],
+                level_stats=level_stats,
+                question_counts=question_counts
+            )
+
+    def _apply(self, conn, day, total_vocabulary, accuracy, final_difficulty, level_stats,
+               question_counts=None, source=SOURCE_LIVE):
+        """
+        在同一事务中更新所有汇总表
+        level_stats: {等级: {'total', 'correct', 'mastery'}}，只包含作答过的等级
+        """
+        conn.execute("""
+            INSERT INTO daily_counts (day, tests, vocabulary_sum, accuracy_sum) VALUES (?, 1, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                tests = tests + 1,
+                vocabulary_sum = vocabulary_sum + excluded.vocabulary_sum,
+                accuracy_sum = accuracy_sum + excluded.accuracy_sum
+        """, (day, float(total_vocabulary), float(accuracy)))
+        conn.execute("""
+            INSERT INTO daily_levels (day, level, tests) VALUES (?, ?, 1)
+            ON CONFLICT(day, level) DO UPDATE SET tests = tests + 1
+        """, (day, int(final_difficulty)))
+        conn.execute("""
+            INSERT INTO vocabulary_histogram (bucket, tests) VALUES (?, 1)
+            ON CONFLICT(bucket) DO UPDATE SET tests = tests + 1
+        """, (int(total_vocabulary // VOCABULARY_BUCKET_SIZE) * VOCABULARY_BUCKET_SIZE,))
+        conn.executemany("""
+            INSERT INTO level_accuracy (level, source, tests, attempted, correct, mastery_sum)
+            VALUES (?, ?, 1, ?, ?, ?)
+            ON CONFLICT(level, source) DO UPDATE SET
+                tests = tests + 1,
+                attempted = attempted + excluded.attempted,
+                correct = correct + excluded.correct,
+                mastery_sum = mastery_sum + excluded.mastery_sum
+        """, [
+            (level, source, int(stats['total']), int(stats['correct']), float(stats['mastery']))
+            for level, stats in level_stats.items()
+        ])
+        if question_counts:
+            conn.executemany("""
+                INSERT INTO question_stats (question_id, attempts, correct) VALUES (?, ?, ?)
+                ON CONFLICT(question_id) DO UPDATE SET
+                    attempts = attempts + excluded.attempts,
+                    correct = correct + excluded.correct
+            """, [(qid, attempts, correct) for qid, (attempts, correct) in question_counts.items()])
+
+    def reset(self, tables=ALL_ROLLUP_TABLES):
+        """清空汇总表（回填前使用）"""
+        with self._connect() as conn:
+            for table in tables:
+                conn.execute(f"DELETE FROM {table}")
+
+    # ---------- 读取 ----------
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    def totals(self):
+        """全部历史的测试总数和平均词汇量"""
+        row = self._connect().execute(
+            "SELECT COALESCE(SUM(tests), 0), COALESCE(SUM(vocabulary_sum), 0) FROM daily_counts"
+        ).fetchone()
+        tests, vocabulary_sum = row
+        return {
+            'tests': tests,
+            'avg_vocabulary': vocabulary_sum / tests if tests else 0,
+        }
+
+    def daily_summary(self, days=30):
+        """最近若干天每日测试数、平均词汇量和平均正确率"""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        return self._query("""
+            SELECT day, tests,
+                   vocabulary_sum / tests AS avg_vocabulary,
+                   accuracy_sum / tests AS avg_accuracy
+            FROM daily_counts WHERE day >= ? ORDER BY day
+        """, (since,))
+
+    def level_distribution(self, days=7):
+        """最近若干天的最终难度分布"""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        return self._query("""
+            SELECT level, SUM(tests) AS tests
+            FROM daily_levels WHERE day >= ? GROUP BY level ORDER BY level
+        """, (since,))
+
+    def vocabulary_histogram(self):
+        """词汇量分段直方图"""
+        return self._query("SELECT bucket, tests FROM vocabulary_histogram ORDER BY bucket")
+
+    def level_mastery(self):
+        """
+        各难度等级的平均掌握度（%），只统计作答过该等级的测试
+        avg_mastery：每场测试在该等级的掌握度的平均值
+        question_accuracy：该等级全部作答题目的正确率（只来自逐题统计的新结果）
+        approximate_tests：其中由结果 CSV 回填估算的测试数
+        """
+        return self._query("""
+            SELECT level,
+                   SUM(mastery_sum) / SUM(tests) * 100 AS avg_mastery,
+                   CAST(SUM(correct) AS REAL) / NULLIF(SUM(attempted), 0) * 100 AS question_accuracy,
+                   SUM(tests) AS tests,
+                   SUM(CASE WHEN source = ? THEN tests ELSE 0 END) AS approximate_tests
+            FROM level_accuracy GROUP BY level ORDER BY level
+        """, (SOURCE_BACKFILL,))
+
+    def question_stats(self, limit=20, min_attempts=1):
+        """正确率最低的题目"""
+        return self._query("""
+            SELECT question_id, attempts, correct, CAST(correct AS REAL) / attempts * 100 AS correct_rate
+            FROM question_stats WHERE attempts >= ?
+            ORDER BY correct_rate, attempts DESC LIMIT ?
+        """, (min_attempts, limit))
+
+# ==================== 核心函数 - 历史数据回填 ====================
+def _parse_percent(series):
+    """把 "85.0%" 格式的字符串转换为数值"""
+    return pd.to_numeric(series.astype(str).str.rstrip('%'), errors='coerce').fillna(0)
+
+def backfill_from_csv(store, results_file, chunksize=BACKFILL_CHUNKSIZE):
+    """
+    根据已有的结果 CSV 重建汇总表（会先清空这些汇总表）
+    结果 CSV 中没有逐题记录，question_stats 保持不变，只由新保存的结果累积；
+    各等级的作答情况只能按掌握度大于 0 估算（全部答错的等级无法区分），
+    这部分 level_accuracy 记为回填来源，统计面板标注为近似值
+    返回：导入的测试数
+    """
+    store.reset(CSV_ROLLUP_TABLES)
+    imported = 0
+    conn = store._connect()
+    for chunk in pd.read_csv(results_file, chunksize=chunksize):
+        day = chunk['test_date'].astype(str).str[:10]
+        accuracy = _parse_percent(chunk['accuracy'])
+        final_difficulty = pd.to_numeric(
+            chunk['final_difficulty'].astype(str).str.extract(r'(\d+)', expand=False), errors='coerce'
+        ).fillna(1).astype(int)
+        mastery = {level: _parse_percent(chunk[f'level{level}_mastery']) / 100 for level in LEVELS}
+
+        with conn:
+            for i in range(len(chunk)):
+                store._apply(
+                    conn,
+                    day=day.iat[i],
+                    total_vocabulary=chunk['total_vocabulary'].iat[i],
+                    accuracy=accuracy.iat[i],
+                    final_difficulty=final_difficulty.iat[i],
+                    level_stats={
+                        level: {'total': 0, 'correct': 0, 'mastery': mastery[level].iat[i]}
+                        for level in LEVELS if mastery[level].iat[i] > 0
+                    },
+                    source=SOURCE_BACKFILL
+                )
+        imported += len(chunk)
+    return imported
+
+# ==================== 命令行入口 ====================
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="测试结果统计汇总")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser("backfill", help="根据已有结果CSV重建汇总表")
+    backfill.add_argument("results_file", nargs="?", default=DEFAULT_RESULTS_FILE)
+    backfill.add_argument("--db", default=DEFAULT_DB_FILE, help="汇总表数据库文件")
+    args = parser.parse_args(argv)
+
+    try:
+        imported = backfill_from_csv(AnalyticsStore(args.db), args.results_file)
+    except (OSError, KeyError, sqlite3.Error) as e:
+        print(f"❌ 回填失败: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ 已导入 {imported} 条测试结果到 {args.db}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 轻量 JSON HTTP 接口（不依赖 Streamlit）
+
+供移动端和 LMS 客户端使用，流程与页面完全一致（难度规则和评分见 voca_rules.py）：
+    POST /tests                      {"user_name", "user_token"?} → 创建测试，返回 test_id 和 user_token
+    GET  /tests/{test_id}/next                                    → 下一题（不含答案）
+    POST /tests/{test_id}/answers    {"question_id", "answer"}    → 提交答案
+    GET  /tests/{test_id}/results                                 → 测试结果
+    GET  /health                                                  → 题库指纹与会话数
+
+基于 asyncio 的单进程服务器，题库在内存中共享，支持 HTTP/1.1 长连接。
+选题、判分等内存操作直接在事件循环中执行；检查点和结果的读写在单独的 I/O 线程中执行，
+磁盘较慢时也不会阻塞其他连接。
+完成的测试与页面一样保存到结果文件、历史成绩、统计汇总表和外部结果表（见 result_recorder.py）。
+历史成绩按 user_token 归档：客户端保存第一次返回的令牌，之后创建测试时传入。
+
+用法：
+    python api_server.py --port 8765 --bank data.xlsx
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from analytics import AnalyticsStore, DEFAULT_DB_FILE as DEFAULT_ANALYTICS_DB
+from question_bank import build_question_bank
+from result_recorder import ResultRecorder, DEFAULT_RESULTS_FILE
+from results_sink import create_results_sink_from_env
+from routing import ItemQueues, INITIAL_STATE, next_state, state_level
+from session_store import SQLiteCheckpointStore, rebuild_test_state
+from user_history import (
+    HistoryStore,
+    DEFAULT_DB_FILE as DEFAULT_HISTORY_DB,
+    new_user_token,
+    is_valid_user_token,
+)
+from voca_rules import MAX_QUESTIONS, INITIAL_DIFFICULTY, compute_results
+
+# ==================== 常量配置 ====================
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BANK_FILE = "data.xlsx"
+SESSION_TTL = 2 * 3600          # 内存中会话的有效期（秒）
+MAX_BODY_SIZE = 64 * 1024       # 请求体上限（字节）
+
+HTTP_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+                500: "Internal Server Error"}
+
+class ApiError(Exception):
+    """返回给客户端的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ==================== 核心类 - 测试引擎 ====================
+class TestEngine:
+    """
+    与页面相同的自适应测试流程，会话保存在内存中
+    可选地写入检查点，其他进程（包括 Streamlit 页面）可以据此恢复测试；
+    测试完成时通过 recorder（ResultRecorder）保存结果
+    会读写存储的方法是协程，存储操作在 I/O 线程中执行
+    """
+
+    def __init__(self, questions, checkpoint_store=None, bank_fingerprint="", recorder=None):
+        self.question_list = list(questions)
+        self.questions = {q['id']: q for q in questions}
+        self.bank_fingerprint = bank_fingerprint
+        self.checkpoint_store = checkpoint_store
+        self.recorder = recorder
+        self.sessions = {}
+        # 单个 I/O 线程：存储操作按提交顺序执行，SQLite 连接也只在这个线程中使用
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vocatest-io")
+
+    async def _run_io(self, func, *args):
+        """在 I/O 线程中执行阻塞的存储操作"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, func, *args)
+
+    def close(self):
+        """等待未完成的存储操作并关闭 I/O 线程"""
+        self._io_executor.shutdown(wait=True)
+
+    # ---------- 会话管理 ----------
+    async def start_test(self, user_name, user_token=None):
+        """创建测试（未提供用户令牌时生成新的令牌），返回 test_id"""
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        unique_hash = hashlib.md5(f"{user_name}{timestamp}{uuid.uuid4().hex}".encode()).hexdigest()[:8]
+        test_id = f"VT_{timestamp}_{unique_hash}"
+
+        session = self._new_session(test_id, user_name)
+        session['user_token'] = user_token or new_user_token()
+        if self.checkpoint_store is not None:
+            await self._run_io(self.checkpoint_store.start_test, test_id, user_name, session['user_token'])
+        self.sessions[test_id] = session
+        return test_id
+
+    def _new_session(self, test_id, user_name):
+        return {
+            'test_id': test_id,
+            'user_name': user_name,
+            'user_token': None,
+            'current_question_num': 1,
+            'current_difficulty': INITIAL_DIFFICULTY,
+            'route_state': INITIAL_STATE,
+            'item_queues': None,
+            'used_question_ids': set(),
+            'user_answers': [],
+            'first_two_results': [],
+            'current_question': None,
+            'results': None,
+            'saving_answer': False,
+            'last_seen': time.monotonic(),
+        }
+
+    async def get_session(self, test_id):
+        """获取会话，内存中没有时尝试从检查点恢复"""
+        session = self.sessions.get(test_id)
+        if session is None and self.checkpoint_store is not None:
+            checkpoint = await self._run_io(self.checkpoint_store.load, test_id)
+            # 读取期间其他请求可能已经恢复了该测试
+            session = self.sessions.get(test_id)
+            if session is None and checkpoint is not None and not checkpoint['completed']:
+                session = self._new_session(test_id, checkpoint['user_name'])
+                session['user_token'] = checkpoint['user_token']
+                session.update(rebuild_test_state(checkpoint['answers']))
+                self.sessions[test_id] = session
+        if session is None:
+            raise ApiError(404, "测试不存在或已过期")
+        session['last_seen'] = time.monotonic()
+        return session
+
+    def purge_expired(self):
+        """清理长时间无操作的会话"""
+        cutoff = time.monotonic() - SESSION_TTL
+        for test_id in [tid for tid, s in self.sessions.items() if s['last_seen'] < cutoff]:
+            del self.sessions[test_id]
+
+    # ---------- 自适应流程 ----------
+    def _is_finished(self, session):
+        return session['current_question_num'] > MAX_QUESTIONS or session['results'] is not None
+
+    def select_next_question(self, session, target_difficulty):
+        """从该测试预先打乱的分级队列中取题，该难度没有时从其他难度中选择"""
+        if session['item_queues'] is None:
+            session['item_queues'] = ItemQueues(self.question_list, session['used_question_ids'])
+        selected = session['item_queues'].pop(target_difficulty)
+        if selected is not None:
+            session['used_question_ids'].add(selected['id'])
+        return selected
+
+    async def next_question(self, test_id):
+        """返回当前题目（未作答前重复请求返回同一道题）"""
+        session = await self.get_session(test_id)
+        if self._is_finished(session):
+            return {'finished': True}
+
+        if session['current_question'] is None:
+            question = self.select_next_question(session, state_level(session['route_state']))
+            if question is None:
+                # 题库用完，提前结束测试
+                session['current_question_num'] = MAX_QUESTIONS + 1
+                if session['user_answers']:
+                    await self._finish(session)
+                return {'finished': True}
+            session['current_question'] = question
+
+        question = session['current_question']
+        return {
+            'finished': False,
+            'question_num': session['current_question_num'],
+            'total_questions': MAX_QUESTIONS,
+            'question_id': question['id'],
+            'question': question['question'],
+            'options': [opt for opt in question['options'] if opt.strip()],
+        }
+
+    async def submit_answer(self, test_id, question_id, selected_option):
+        """提交当前题目的答案（与 process_user_answer 相同的记录和难度调整）"""
+        session = await self.get_session(test_id)
+        question = session['current_question']
+        if session['saving_answer']:
+            raise ApiError(409, "上一次提交尚未完成")
+        if self._is_finished(session) or question is None:
+            raise ApiError(409, "当前没有待作答的题目")
+        if question_id != question['id']:
+            raise ApiError(409, "题目ID与当前题目不一致")
+        if selected_option not in question['options'] or not str(selected_option).strip():
+            raise ApiError(400, "答案不是该题的有效选项")
+
+        correct_answer = question['options'][question['correct']]
+        is_correct = (selected_option == correct_answer)
+        question_num = session['current_question_num']
+
+        answer_record = {
+            'question_id': question['id'],
+            'question_text': question['question'],
+            'user_answer': selected_option,
+            'correct_answer': correct_answer,
+            'is_correct': is_correct,
+            'difficulty': question['difficulty'],
+            'question_num': question_num
+        }
+        # 先写检查点，写入失败时会话保持不变，客户端可以重新提交
+        if self.checkpoint_store is not None:
+            session['saving_answer'] = True
+            try:
+                await self._run_io(self.checkpoint_store.append_answer, test_id, answer_record)
+            finally:
+                session['saving_answer'] = False
+
+        session['user_answers'].append(answer_record)
+
+        if question_num <= 2:
+            session['first_two_results'].append(is_correct)
+        session['route_state'] = next_state(session['route_state'], question_num, is_correct)
+        session['current_difficulty'] = state_level(session['route_state'])
+
+        # 前进到下一题，最后一题作答后立即保存结果
+        session['current_question_num'] += 1
+        session['current_question'] = None
+        if session['current_question_num'] > MAX_QUESTIONS:
+            await self._finish(session)
+
+        return {
+            'accepted': True,
+            'question_num': question_num,
+            'finished': self._is_finished(session),
+        }
+
+    async def get_results(self, test_id):
+        """测试结果（与 calculate_test_results 相同）"""
+        session = await self.get_session(test_id)
+        if not self._is_finished(session) or not session['user_answers']:
+            raise ApiError(409, "测试尚未完成")
+        return await self._finish(session)
+
+    async def _finish(self, session):
+        """计算并保存测试结果，每场测试只执行一次"""
+        if session['results'] is None:
+            session['results'] = {
+                'user_name': session['user_name'],
+                'user_token': session['user_token'],
+                'test_id': session['test_id'],
+                'test_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                **compute_results(session['user_answers'], session['current_difficulty']),
+                'answers': session['user_answers']
+            }
+            if self.checkpoint_store is not None or self.recorder is not None:
+                await self._run_io(self._save_results, session['results'])
+        return session['results']
+
+    def _save_results(self, results):
+        """标记检查点已完成并保存结果（在 I/O 线程中执行）"""
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.complete_test(results['test_id'])
+        if self.recorder is not None:
+            self.recorder.record(results)
+
+# ==================== 核心函数 - HTTP 处理 ====================
+def _read_json(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ApiError(400, "请求体不是有效的JSON")
+    if not isinstance(data, dict):
+        raise ApiError(400, "请求体必须是JSON对象")
+    return data
+
+async def route(engine, method, path, body):
+    """
+    分发请求
+    返回：(状态码, 响应数据)
+    """
+    parts = [p for p in path.split('?', 1)[0].split('/') if p]
+
+    if parts == ['health'] and method == 'GET':
+        return 200, {'status': 'ok', 'bank_fingerprint': engine.bank_fingerprint,
+                     'sessions': len(engine.sessions)}
+
+    if parts == ['tests']:
+        if method != 'POST':
+            raise ApiError(405, "只支持 POST")
+        data = _read_json(body)
+        user_name = str(data.get('user_name', '')).strip()
+        if not 2 <= len(user_name) <= 20:
+            raise ApiError(400, "请输入2-20个字符的姓名或昵称")
+        user_token = data.get('user_token')
+        if user_token is not None and not is_valid_user_token(user_token):
+            raise ApiError(400, "user_token 格式无效")
+        test_id = await engine.start_test(user_name, user_token)
+        return 201, {'test_id': test_id, 'user_token': engine.sessions[test_id]['user_token']}
+
+    if len(parts) == 3 and parts[0] == 'tests':
+        test_id, action = parts[1], parts[2]
+        if action == 'next' and method == 'GET':
+            return 200, await engine.next_question(test_id)
+        if action == 'answers' and method == 'POST':
+            data = _read_json(body)
+            return 200, await engine.submit_answer(test_id, data.get('question_id'), data.get('answer'))
+        if action == 'results' and method == 'GET':
+            return 200, await engine.get_results(test_id)
+        if action in ('next', 'answers', 'results'):
+            raise ApiError(405, "请求方法不支持")
+
+    raise ApiError(404, "接口不存在")
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    headers = (
+        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'OK')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return headers.encode('latin-1') + body
+
+async def handle_connection(engine, reader, writer):
+    """处理一个连接上的全部请求（HTTP/1.1 长连接）"""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+
+            lines = head.decode('latin-1').split("\r\n")
+            try:
+                method, path, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, {'error': "请求行格式错误"}, False))
+                break
+
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+            try:
+                length = int(headers.get('content-length', 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(400, {'error': "Content-Length 无效"}, False))
+                break
+            if length > MAX_BODY_SIZE:
+                writer.write(_response(413, {'error': "请求体过大"}, False))
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            try:
+                status, payload = await route(engine, method, path, body)
+            except ApiError as e:
+                status, payload = e.status, {'error': e.message}
+            except Exception as e:
+                print(f"❌ 处理请求失败 {method} {path}: {e!r}", file=sys.stderr)
+                status, payload = 500, {'error': "服务器内部错误"}
+
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def _purge_loop(engine):
+    while True:
+        await asyncio.sleep(60)
+        engine.purge_expired()
+
+async def serve(engine, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+    """启动服务器并一直运行；ready 为可选的 asyncio.Event，监听开始后置位"""
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(engine, r, w), host, port
+    )
+    purge_task = asyncio.create_task(_purge_loop(engine))
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        purge_task.cancel()
+
+def create_recorder(results_file=DEFAULT_RESULTS_FILE, history_db=DEFAULT_HISTORY_DB,
+                    analytics_db=DEFAULT_ANALYTICS_DB):
+    """创建与页面相同的结果保存器（外部结果表按环境变量配置）"""
+    return ResultRecorder(
+        results_file,
+        history=HistoryStore(history_db) if history_db else None,
+        analytics=AnalyticsStore(analytics_db) if analytics_db else None,
+        sink=create_results_sink_from_env()
+    )
+
+def create_engine(bank_file=DEFAULT_BANK_FILE, checkpoint_db=None, recorder=None):
+    """加载题库并创建测试引擎（不传 recorder 时不保存结果）"""
+    bank = build_question_bank(bank_file)
+    store = SQLiteCheckpointStore(checkpoint_db) if checkpoint_db else None
+    return TestEngine(bank['questions'], store, bank['fingerprint'], recorder)
+
+# ==================== 命令行入口 ====================
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="词汇量测试 JSON HTTP 接口")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bank", default=DEFAULT_BANK_FILE, help="题库Excel文件")
+    parser.add_argument("--checkpoint-db", help="检查点数据库（与页面共用时可跨进程恢复测试）")
+    parser.add_argument("--results-file", default=DEFAULT_RESULTS_FILE, help="结果保存文件（与页面共用）")
+    parser.add_argument("--history-db", default=DEFAULT_HISTORY_DB, help="历史成绩数据库")
+    parser.add_argument("--analytics-db", default=DEFAULT_ANALYTICS_DB, help="统计汇总表数据库")
+    args = parser.parse_args(argv)
+
+    try:
+        recorder = create_recorder(args.results_file, args.history_db, args.analytics_db)
+        engine = create_engine(args.bank, args.checkpoint_db, recorder)
+    except (OSError, sqlite3.Error) as e:
+        print(f"❌ 启动失败: {e}", file=sys.stderr)
+        return 1
+    if not engine.questions:
+        print("❌ 题库为空", file=sys.stderr)
+        return 1
+
+    print(f"✅ 已加载 {len(engine.questions)} 道题目，监听 http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(engine, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        if recorder.sink is not None:
+            recorder.sink.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
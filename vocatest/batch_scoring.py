@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 离线答题卡批量评分
+
+输入为长表格式的答题记录（每行一道题）：
+    test_id, question_id, is_correct [, difficulty] [, question_num]
+
+评分规则与页面中的 calculate_test_results() 完全一致（见 voca_rules.py），
+但全部使用 NumPy / pandas 分组运算，按块流式读写，不经过 Streamlit 会话状态。
+
+题目ID为内容哈希时需要用 --bank 指定题库以确定难度（或在输入中提供 difficulty 列）。
+
+用法：
+    python batch_scoring.py answers.csv -o scored.csv --bank data.xlsx
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from question_bank import build_question_bank, question_difficulty_map
+from routing import ROUTING_TABLE, INITIAL_STATE, FIRST_TWO_STATES, build_routing_table
+from voca_rules import (
+    DIFFICULTY_LEVELS,
+    BASE_VOCABULARY,
+    SUGGESTION_THRESHOLDS,
+    TOP_SUGGESTION,
+)
+
+# ==================== 常量配置 ====================
+REQUIRED_COLUMNS = ['test_id', 'question_id', 'is_correct']
+DEFAULT_CHUNKSIZE = 1_000_000  # 每块读取的答题记录行数
+LEVELS = np.arange(1, 6)
+
+_INCREMENTS = np.array([DIFFICULTY_LEVELS[d]["increment"] for d in LEVELS], dtype=np.float64)
+_BASE_SCORES = np.array([DIFFICULTY_LEVELS[d]["base_score"] for d in LEVELS], dtype=np.int64)
+_THRESHOLDS = np.array([t for t, _ in SUGGESTION_THRESHOLDS], dtype=np.float64)
+_SUGGESTIONS = np.array([s for _, s in SUGGESTION_THRESHOLDS] + [TOP_SUGGESTION], dtype=object)
+_TRUE_STRINGS = {'1', 'true', 't', 'yes', 'y', '对', '正确'}
+
+# ==================== 数据预处理 ====================
+def _to_bool(series):
+    """把 is_correct 列统一转换为布尔数组（支持 0/1、True/False 及常见字符串）"""
+    if series.dtype == bool:
+        return series.to_numpy()
+    if pd.api.types.is_numeric_dtype(series):
+        return series.fillna(0).to_numpy() != 0
+    return series.astype(str).str.strip().str.lower().isin(_TRUE_STRINGS).to_numpy()
+
+def _resolve_difficulty(answers, difficulty_map=None):
+    """
+    确定每条答题记录的难度等级
+    优先使用 difficulty 列，其次使用 question_id → 难度映射，
+    最后从旧版 L{难度}_{序号} 格式的题目ID中解析
+    """
+    if 'difficulty' in answers.columns:
+        difficulty = pd.to_numeric(answers['difficulty'], errors='coerce')
+    else:
+        # 题目ID重复度很高，只对去重后的ID做映射/解析
+        id_codes, unique_ids = pd.factorize(answers['question_id'].astype(str))
+        if difficulty_map is not None:
+            unique_difficulty = pd.Series(unique_ids).map(difficulty_map)
+        else:
+            unique_difficulty = pd.to_numeric(
+                pd.Series(unique_ids).str.extract(r'^L(\d+)_', expand=False),
+                errors='coerce'
+            )
+        difficulty = pd.Series(
+            unique_difficulty.to_numpy(dtype=np.float64)[id_codes],
+            index=answers.index
+        )
+
+    invalid = ~difficulty.isin(LEVELS)
+    if invalid.any():
+        examples = answers.loc[invalid, 'question_id'].astype(str).unique()[:5]
+        raise ValueError(f"无法确定 {int(invalid.sum())} 条记录的难度等级，例如: {list(examples)}")
+
+    return difficulty.to_numpy(dtype=np.int64)
+
+# ==================== 核心函数 - 批量评分 ====================
+def _replay_final_difficulty(codes, correct, n_tests, order_key=None):
+    """
+    按题目顺序逐列查路由表，得到每场测试的最终难度
+    所有测试同时推进，循环次数只与单场测试的最大题数有关
+    """
+    if order_key is None:
+        order = np.argsort(codes, kind='stable')
+    else:
+        order = np.lexsort((order_key, codes))
+
+    sorted_codes = codes[order]
+    group_sizes = np.bincount(sorted_codes, minlength=n_tests)
+    group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+    positions = np.arange(len(sorted_codes)) - group_starts[sorted_codes]
+
+    max_len = int(group_sizes.max()) if n_tests else 0
+    answer_matrix = np.full((n_tests, max_len), -1, dtype=np.int8)
+    answer_matrix[sorted_codes, positions] = correct[order]
+
+    # 题数超过页面上限的答题卡按同一规则生成更长的路由表
+    table = ROUTING_TABLE if max_len < len(ROUTING_TABLE) else build_routing_table(max_len)
+    state = np.full(n_tests, INITIAL_STATE, dtype=np.int8)
+
+    for col in range(max_len):
+        column = answer_matrix[:, col]
+        new_state = table[col + 1, state, (column == 1).astype(np.intp)]
+        state = np.where(column >= 0, new_state, state)
+
+    return state // FIRST_TWO_STATES
+
+def score_answer_sheets(answers, difficulty_map=None):
+    """
+    批量计算答题卡结果
+    参数：长表格式的答题记录 DataFrame；可选的 question_id → 难度映射
+    返回：每场测试一行的结果 DataFrame（按 test_id 首次出现顺序）
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in answers.columns]
+    if missing_columns:
+        raise ValueError(f"答题记录缺少必要的列: {missing_columns}")
+
+    codes, test_ids = pd.factorize(answers['test_id'], sort=False)
+    n_tests = len(test_ids)
+    correct = _to_bool(answers['is_correct'])
+    difficulty = _resolve_difficulty(answers, difficulty_map)
+
+    # 按 (测试, 难度) 分组计数
+    cell = codes * 5 + (difficulty - 1)
+    level_total = np.bincount(cell, minlength=n_tests * 5).reshape(n_tests, 5)
+    level_correct = np.bincount(cell[correct], minlength=n_tests * 5).reshape(n_tests, 5)
+
+    total_questions = level_total.sum(axis=1)
+    correct_count = level_correct.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = np.where(total_questions > 0, correct_count / total_questions * 100, 0.0)
+        level_accuracy = np.where(level_total > 0, level_correct / level_total * 100, 0.0)
+    level_mastery = level_accuracy / 100
+
+    # 逐等级累加，保证与逐题计算的浮点结果一致
+    vocabulary_increment = np.zeros(n_tests, dtype=np.float64)
+    for i in range(5):
+        vocabulary_increment += _INCREMENTS[i] * level_mastery[:, i]
+    total_vocabulary = BASE_VOCABULARY + vocabulary_increment
+
+    total_score = level_correct @ _BASE_SCORES
+    max_score = level_total @ _BASE_SCORES
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score_percentage = np.where(max_score > 0, total_score / max_score * 100, 0.0)
+
+    order_key = None
+    if 'question_num' in answers.columns:
+        order_key = pd.to_numeric(answers['question_num'], errors='coerce').fillna(0).to_numpy()
+    final_difficulty = _replay_final_difficulty(codes, correct, n_tests, order_key)
+
+    suggestion = _SUGGESTIONS[np.searchsorted(_THRESHOLDS, total_vocabulary, side='right')]
+
+    results = {
+        'test_id': np.asarray(test_ids),
+        'total_questions': total_questions,
+        'correct_count': correct_count,
+        'accuracy': accuracy,
+        'total_score': total_score,
+        'max_score': max_score,
+        'score_percentage': score_percentage,
+        'base_vocabulary': BASE_VOCABULARY,
+        'vocabulary_increment': vocabulary_increment,
+        'total_vocabulary': total_vocabulary,
+        'final_difficulty': final_difficulty.astype(np.int64),
+    }
+    for i, level in enumerate(LEVELS):
+        results[f'level{level}_total'] = level_total[:, i]
+        results[f'level{level}_correct'] = level_correct[:, i]
+        results[f'level{level}_mastery'] = level_accuracy[:, i]
+    results['suggestion'] = suggestion
+
+    return pd.DataFrame(results)
+
+# ==================== 核心函数 - 流式处理 ====================
+def iter_scored_chunks(source, chunksize=DEFAULT_CHUNKSIZE, difficulty_map=None):
+    """
+    分块读取答题记录并逐块评分
+    要求同一场测试的记录在文件中连续出现；跨块的测试会留到下一块一起计算
+    返回：逐块产出结果 DataFrame 的生成器
+    """
+    carry = None
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        # 最后一场测试可能尚未读完，留到下一块
+        last_test_id = chunk['test_id'].iloc[-1]
+        tail = (chunk['test_id'] == last_test_id).to_numpy()
+        carry = chunk[tail]
+        complete = chunk[~tail]
+
+        if len(complete):
+            yield score_answer_sheets(complete, difficulty_map)
+
+    if carry is not None and len(carry):
+        yield score_answer_sheets(carry, difficulty_map)
+
+def score_file(source, output, chunksize=DEFAULT_CHUNKSIZE, difficulty_map=None):
+    """
+    对答题记录文件批量评分并流式写出结果
+    返回：评分的测试场数
+    """
+    total_tests = 0
+    for i, scored in enumerate(iter_scored_chunks(source, chunksize, difficulty_map)):
+        scored.to_csv(
+            output,
+            mode='w' if i == 0 else 'a',
+            header=(i == 0),
+            index=False,
+            encoding='utf-8-sig' if i == 0 else 'utf-8'
+        )
+        total_tests += len(scored)
+    return total_tests
+
+# ==================== 命令行入口 ====================
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="离线答题卡批量评分")
+    parser.add_argument("input", help="长表格式答题记录CSV（test_id, question_id, is_correct）")
+    parser.add_argument("-o", "--output", default="scored_results.csv", help="结果输出CSV")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="每块读取的行数")
+    parser.add_argument("--bank", help="题库Excel文件，用于确定题目难度")
+    args = parser.parse_args(argv)
+
+    try:
+        difficulty_map = None
+        if args.bank:
+            difficulty_map = question_difficulty_map(build_question_bank(args.bank))
+        total_tests = score_file(args.input, args.output, args.chunksize, difficulty_map)
+    except (OSError, ValueError) as e:
+        print(f"❌ 评分失败: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ 已评分 {total_tests} 场测试，结果保存至 {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - HTTP 接口与 Streamlit 页面的性能对比
+
+- HTTP 接口：在本进程内启动 api_server，用多个长连接并发完成整场测试，
+  统计提交答案的吞吐（次/秒）
+- Streamlit 页面：用 streamlit.testing 的 AppTest 逐题执行页面脚本
+  （与真实服务器相同的整脚本重跑），统计每次提交答案的耗时；
+  在临时目录中运行，不会写入正式的结果文件和数据库
+
+用法：
+    python bench_api.py --tests 2000 --concurrency 50 --streamlit-tests 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from api_server import create_engine, serve, DEFAULT_BANK_FILE
+from voca_rules import MAX_QUESTIONS
+
+BENCH_HOST = "127.0.0.1"
+BENCH_PORT = 8766
+
+# ==================== HTTP 接口 ====================
+def _start_server(engine, port):
+    """在后台线程中运行服务器，监听开始后返回"""
+    started = threading.Event()
+
+    def run():
+        async def main():
+            ready = asyncio.Event()
+            task = asyncio.create_task(serve(engine, BENCH_HOST, port, ready))
+            await ready.wait()
+            started.set()
+            await task
+        asyncio.run(main())
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+async def _request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {BENCH_HOST}\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.decode('latin-1').split("\r\n"):
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    return json.loads(await reader.readexactly(length))
+
+async def _client(port, n_tests, answer_times):
+    """在一个长连接上依次完成 n_tests 场测试"""
+    reader, writer = await asyncio.open_connection(BENCH_HOST, port)
+    for _ in range(n_tests):
+        test_id = (await _request(reader, writer, "POST", "/tests", {'user_name': "bench"}))['test_id']
+        while True:
+            question = await _request(reader, writer, "GET", f"/tests/{test_id}/next")
+            if question['finished']:
+                break
+            start = time.perf_counter()
+            await _request(reader, writer, "POST", f"/tests/{test_id}/answers", {
+                'question_id': question['question_id'],
+                'answer': random.choice(question['options'])
+            })
+            answer_times.append(time.perf_counter() - start)
+        await _request(reader, writer, "GET", f"/tests/{test_id}/results")
+    writer.close()
+
+def bench_http(bank_file, n_tests, concurrency, port=BENCH_PORT):
+    """返回 HTTP 接口的统计数据"""
+    engine = create_engine(bank_file)
+    _start_server(engine, port)
+
+    answer_times = []
+    per_client = max(n_tests // concurrency, 1)
+
+    async def run():
+        await asyncio.gather(*[_client(port, per_client, answer_times) for _ in range(concurrency)])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    total_tests = per_client * concurrency
+    # 每场测试：1 次创建 + (题数+1) 次取题 + 题数次提交 + 1 次结果
+    total_requests = total_tests * (2 * MAX_QUESTIONS + 3)
+    answer_times.sort()
+    return {
+        'tests': total_tests,
+        'elapsed': elapsed,
+        'requests_per_sec': total_requests / elapsed,
+        'answers_per_sec': len(answer_times) / elapsed,
+        'answer_p50_ms': answer_times[len(answer_times) // 2] * 1000,
+        'answer_p99_ms': answer_times[int(len(answer_times) * 0.99)] * 1000,
+    }
+
+# ==================== Streamlit 页面 ====================
+def bench_streamlit(bank_file, n_tests):
+    """返回 Streamlit 页面每次提交答案的平均耗时；未安装 streamlit 时返回 None"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+
+    app_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocaapp.py")
+    answer_times = []
+    cwd = os.getcwd()
+    # 页面把结果、检查点、统计和历史写到当前目录，切换到只含题库副本的临时目录
+    with tempfile.TemporaryDirectory(prefix="vocatest_bench_") as workdir:
+        shutil.copy(bank_file, os.path.join(workdir, "data.xlsx"))
+        os.chdir(workdir)
+        try:
+            for _ in range(n_tests):
+                at = AppTest.from_file(app_file, default_timeout=60).run()
+                at.text_input[0].input("bench")
+                [b for b in at.button if b.label.startswith("开始")][0].click().run()
+                for _ in range(MAX_QUESTIONS):
+                    if at.session_state.test_phase != "testing":
+                        break
+                    at.radio[0].set_value(random.choice(at.radio[0].options)).run()
+                    start = time.perf_counter()
+                    [b for b in at.button if b.label == "提交答案"][0].click().run()
+                    answer_times.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+    if not answer_times:
+        return None
+    mean = sum(answer_times) / len(answer_times)
+    return {'answers': len(answer_times), 'answer_mean_ms': mean * 1000, 'answers_per_sec': 1 / mean}
+
+# ==================== 命令行入口 ====================
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="HTTP 接口与 Streamlit 页面性能对比")
+    parser.add_argument("--bank", default=DEFAULT_BANK_FILE, help="题库Excel文件")
+    parser.add_argument("--tests", type=int, default=2000, help="HTTP 接口完成的测试场数")
+    parser.add_argument("--concurrency", type=int, default=50, help="HTTP 并发连接数")
+    parser.add_argument("--streamlit-tests", type=int, default=1, help="Streamlit 页面完成的测试场数（0 跳过）")
+    args = parser.parse_args(argv)
+
+    http = bench_http(args.bank, args.tests, args.concurrency)
+    print(f"HTTP 接口: {http['tests']} 场测试, 用时 {http['elapsed']:.2f}s")
+    print(f"  请求 {http['requests_per_sec']:,.0f} 次/秒, 提交答案 {http['answers_per_sec']:,.0f} 次/秒")
+    print(f"  提交答案延迟 p50 {http['answer_p50_ms']:.2f}ms, p99 {http['answer_p99_ms']:.2f}ms")
+
+    if args.streamlit_tests > 0:
+        page = bench_streamlit(args.bank, args.streamlit_tests)
+        if page is None:
+            print("Streamlit 页面: 未安装 streamlit，跳过")
+        else:
+            print(f"Streamlit 页面: {page['answers']} 次提交, 平均 {page['answer_mean_ms']:.1f}ms/次 "
+                  f"({page['answers_per_sec']:.1f} 次/秒, 单会话串行)")
+            print(f"  HTTP 接口提交答案吞吐约为页面的 {http['answers_per_sec'] / page['answers_per_sec']:,.0f} 倍")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
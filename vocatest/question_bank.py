@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 题库构建
+
+- 题目ID由题目内容（题干、选项、正确答案）的哈希生成，表格中插入或删除行
+  不会改变其他题目的ID，已保存的答题记录和逐题统计保持有效
+- 每个工作表计算内容指纹，题库指纹由各表指纹组合而成；下游缓存以指纹为键，
+  只有内容变化的部分才会失效
+- 重新加载时，文件未修改则直接返回上次结果；文件修改后，指纹未变的工作表
+  跳过解析
+- 构建时检测跨表（及表内）重复的题目
+"""
+
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+# ==================== 常量配置 ====================
+SHEET_NAMES = ["小学初中", "高中", "四六级", "专四雅思托福", "GRE专八"]  # 按难度 1-5 排列
+REQUIRED_COLUMNS = ['question', 'correct_option', 'option_a', 'option_b']
+OPTION_KEYS = ['option_a', 'option_b', 'option_c', 'option_d']
+OPTION_MAP = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+QUESTION_ID_PREFIX = "Q"
+
+# 已编译工作表缓存：工作表指纹 -> 题目列表
+_sheet_cache = {}
+# 题库文件缓存：文件路径 -> (修改时间, 文件大小, 构建结果)
+_file_cache = {}
+_cache_lock = threading.Lock()
+
+# ==================== 核心函数 - 题目ID与指纹 ====================
+def question_content_id(question_text, options, correct_index):
+    """
+    根据题目内容生成稳定的题目ID（与所在工作表和行号无关）
+    返回：如 "Q3f9a0c12d4e7" 的字符串
+    """
+    content = "\x1f".join([question_text.strip()] + [opt.strip() for opt in options] + [str(correct_index)])
+    return QUESTION_ID_PREFIX + hashlib.blake2b(content.encode('utf-8'), digest_size=6).hexdigest()
+
+def sheet_fingerprint(sheet_name, df):
+    """计算工作表内容指纹"""
+    digest = hashlib.sha256(sheet_name.encode('utf-8'))
+    digest.update(df.to_csv(index=False).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def bank_fingerprint(sheet_fingerprints):
+    """由各工作表指纹组合出题库指纹"""
+    digest = hashlib.sha256()
+    for sheet_name in sorted(sheet_fingerprints):
+        digest.update(f"{sheet_name}:{sheet_fingerprints[sheet_name]};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+# ==================== 核心函数 - 工作表解析 ====================
+def compile_sheet(df, difficulty_level, sheet_name):
+    """
+    把一个工作表解析为题目列表
+    返回：题目列表，缺少必要的列时返回空列表
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        return []
+
+    questions = []
+    for idx, row in df.iterrows():
+        try:
+            # 确保题目不为空
+            question_text = str(row['question']).strip()
+            if not question_text:
+                continue
+
+            # 转换正确答案
+            correct_option = str(row['correct_option']).strip().upper()
+            correct_index = OPTION_MAP.get(correct_option, 0)
+
+            # 收集选项
+            options = []
+            for opt_key in OPTION_KEYS:
+                if opt_key in row and not pd.isna(row[opt_key]):
+                    options.append(str(row[opt_key]).strip())
+                else:
+                    options.append("")
+
+            # 确保至少有2个有效选项
+            valid_options = [opt for opt in options if opt.strip()]
+            if len(valid_options) < 2:
+                continue
+
+            # 创建题目对象
+            questions.append({
+                'id': question_content_id(question_text, options, correct_index),
+                'question': question_text,
+                'options': options,
+                'correct': correct_index,
+                'difficulty': difficulty_level,
+                'sheet_name': sheet_name,
+                'row': idx + 2  # 表格中的行号（含表头）
+            })
+
+        except Exception as row_error:
+            continue
+
+    return questions
+
+# ==================== 核心函数 - 题库构建 ====================
+def build_question_bank(file_path):
+    """
+    构建题库
+    返回：{
+        'questions': 题目列表（重复题目只保留第一次出现的）,
+        'sheets': {工作表名: 指纹},
+        'fingerprint': 题库指纹,
+        'duplicates': [{'id', 'question', 'locations'}],
+        'rebuilt_sheets': 本次重新解析的工作表名列表
+    }
+    """
+    stat = os.stat(file_path)
+    with _cache_lock:
+        cached = _file_cache.get(file_path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    excel = pd.ExcelFile(file_path)
+    sheet_fingerprints = {}
+    rebuilt_sheets = []
+    questions_by_sheet = []
+
+    for difficulty_level, sheet_name in enumerate(SHEET_NAMES, 1):
+        try:
+            df = excel.parse(sheet_name)
+        except Exception as sheet_error:
+            continue
+
+        fingerprint = sheet_fingerprint(sheet_name, df)
+        sheet_fingerprints[sheet_name] = fingerprint
+
+        with _cache_lock:
+            compiled = _sheet_cache.get(fingerprint)
+        if compiled is None:
+            compiled = compile_sheet(df, difficulty_level, sheet_name)
+            rebuilt_sheets.append(sheet_name)
+            with _cache_lock:
+                _sheet_cache[fingerprint] = compiled
+        questions_by_sheet.append(compiled)
+
+    # 合并并检测重复题目
+    all_questions = []
+    locations = {}
+    for compiled in questions_by_sheet:
+        for question in compiled:
+            where = f"{question['sheet_name']}#{question['row']}"
+            if question['id'] in locations:
+                locations[question['id']].append(where)
+                continue
+            locations[question['id']] = [where]
+            all_questions.append(question)
+
+    duplicates = [
+        {'id': q['id'], 'question': q['question'], 'locations': locations[q['id']]}
+        for q in all_questions if len(locations[q['id']]) > 1
+    ]
+
+    bank = {
+        'questions': all_questions,
+        'sheets': sheet_fingerprints,
+        'fingerprint': bank_fingerprint(sheet_fingerprints),
+        'duplicates': duplicates,
+        'rebuilt_sheets': rebuilt_sheets,
+    }
+
+    with _cache_lock:
+        # 只保留当前仍在使用的工作表缓存
+        live = set(sheet_fingerprints.values())
+        for fingerprint in [fp for fp in _sheet_cache if fp not in live]:
+            del _sheet_cache[fingerprint]
+        _file_cache[file_path] = (stat.st_mtime_ns, stat.st_size, bank)
+
+    return bank
+
+def question_difficulty_map(bank):
+    """返回题目ID到难度等级的映射"""
+    return {q['id']: q['difficulty'] for q in bank['questions']}
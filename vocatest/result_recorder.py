@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 测试结果保存
+
+页面和 HTTP 接口完成的测试都通过 ResultRecorder 保存，每场测试调用一次：
+- 追加到本地结果 CSV
+- 写入该用户的历史成绩（同时使其缓存失效）
+- 增量更新统计汇总表
+- 加入外部结果表的写入缓冲（如已配置）
+各项互相独立，其中一项失败不影响其他项。
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+from results_sink import RESULT_COLUMNS, format_result_row
+
+# ==================== 常量配置 ====================
+DEFAULT_RESULTS_FILE = "vocabulary_test_results.csv"    # 结果保存文件
+
+# ==================== 核心类 - 结果保存 ====================
+class ResultRecorder:
+    """
+    把一条 calculate_test_results() 结果写入所有去处
+    history: HistoryCache 或 HistoryStore；analytics: AnalyticsStore；sink: BufferedSink（均可省略）
+    """
+
+    def __init__(self, results_file=DEFAULT_RESULTS_FILE, history=None, analytics=None, sink=None):
+        self.results_file = results_file
+        self.history = history
+        self.analytics = analytics
+        self.sink = sink
+        self._file_lock = threading.Lock()
+
+    def record(self, results):
+        """
+        保存一条测试结果
+        返回：是否成功写入结果文件
+        """
+        save_data = format_result_row(results)
+
+        saved = False
+        if self.results_file:
+            try:
+                self._append_csv(save_data)
+                saved = True
+            except Exception as e:
+                pass
+
+        # 写入该用户的历史成绩（同时使其缓存失效）
+        if self.history is not None:
+            try:
+                self.history.record_result(results)
+            except Exception as e:
+                pass
+
+        # 增量更新统计汇总表
+        if self.analytics is not None:
+            try:
+                self.analytics.record_result(results)
+            except Exception as e:
+                pass
+
+        # 同时写入外部结果表，由后台线程批量写出
+        if self.sink is not None:
+            self.sink.add(save_data)
+
+        return saved
+
+    def _append_csv(self, save_data):
+        """追加一行到结果 CSV（新文件先写表头），不重写已有内容"""
+        df = pd.DataFrame([save_data], columns=RESULT_COLUMNS)
+        with self._file_lock:
+            new_file = not os.path.exists(self.results_file) or os.path.getsize(self.results_file) == 0
+            df.to_csv(
+                self.results_file,
+                mode='w' if new_file else 'a',
+                header=new_file,
+                index=False,
+                encoding='utf-8-sig' if new_file else 'utf-8'
+            )
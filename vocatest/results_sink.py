@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 测试结果外部写入（可插拔）
+
+完成的测试结果先进入内存缓冲区，由后台线程按批调用 append_rows 写出，
+大量测试同时结束时也只产生少量 API 请求；遇到限流时指数退避重试。
+
+- GoogleSheetsSink：通过 gspread 写入 Google 表格（复用同一个已授权的客户端）
+- MemorySink：内存替身，用于在无网络环境下测试批量写入和吞吐
+"""
+
+import abc
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# ==================== 常量配置 ====================
+# 结果表的列顺序（与本地 CSV 一致）
+RESULT_COLUMNS = [
+    'test_id', 'user_name', 'test_date', 'total_questions', 'correct_count',
+    'accuracy', 'total_score', 'total_vocabulary', 'final_difficulty', 'suggestion',
+    'level1_mastery', 'level2_mastery', 'level3_mastery', 'level4_mastery', 'level5_mastery'
+]
+
+# 环境变量配置（未设置 GSHEET_KEY_ENV 时不启用表格写入）
+GSHEET_KEY_ENV = "VOCATEST_GSHEET_KEY"                   # 表格ID
+GSHEET_CREDENTIALS_ENV = "VOCATEST_GSHEET_CREDENTIALS"   # 服务账号JSON路径
+GSHEET_WORKSHEET_ENV = "VOCATEST_GSHEET_WORKSHEET"       # 工作表名称
+DEFAULT_CREDENTIALS_FILE = "service_account.json"
+DEFAULT_WORKSHEET = "results"
+GSHEET_SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+DEFAULT_BATCH_SIZE = 50        # 缓冲达到该行数立即写出
+DEFAULT_FLUSH_INTERVAL = 5.0   # 最长缓冲时间（秒）
+DEFAULT_MAX_BUFFER = 10000     # 缓冲区上限，超出时丢弃最旧的行（也是死信行数上限）
+DEFAULT_MAX_RETRIES = 5        # 单批最大重试次数
+DEFAULT_BACKOFF_BASE = 1.0     # 退避初始等待（秒）
+DEFAULT_BACKOFF_MAX = 64.0     # 退避最长等待（秒）
+
+# 单批写出的结果
+WRITE_OK = "ok"             # 已写出
+WRITE_RETRY = "retry"       # 重试次数用完，放回缓冲区稍后再写
+WRITE_REJECTED = "rejected" # 不可重试的错误，移入死信列表
+
+class RateLimitError(Exception):
+    """写入被限流（或临时不可用），可以稍后重试"""
+
+# ==================== 核心函数 - 结果行格式 ====================
+def format_result_row(results):
+    """
+    把 calculate_test_results() 的结果转换为一行保存数据
+    返回：按 RESULT_COLUMNS 排列的字典
+    """
+    save_data = {
+        'test_id': results['test_id'],
+        'user_name': results['user_name'],
+        'test_date': results['test_date'],
+        'total_questions': results['total_questions'],
+        'correct_count': results['correct_count'],
+        'accuracy': f"{results['accuracy']:.1f}%",
+        'total_score': f"{results['total_score']}/{results['max_score']}",
+        'total_vocabulary': int(results['total_vocabulary']),
+        'final_difficulty': f"Lv.{results['final_difficulty']}",
+        'suggestion': results['suggestion']
+    }
+
+    # 添加各难度掌握度
+    for diff in range(1, 6):
+        stats = results['difficulty_stats'][diff]
+        save_data[f'level{diff}_mastery'] = f"{stats['accuracy']:.1f}%"
+
+    return save_data
+
+# ==================== 核心类 - 批量缓冲写入 ====================
+class BufferedSink(abc.ABC):
+    """
+    带缓冲的批量写入基类
+    子类实现 _write_rows(rows)，需要重试的错误由 _is_retryable(exc) 判断；
+    不可重试的批次移入 dead_letters，不会阻塞后续结果
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_buffer=DEFAULT_MAX_BUFFER, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 background=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._buffer = deque(maxlen=max_buffer)
+        self.dead_letters = deque(maxlen=max_buffer)   # (结果行, 错误信息)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        # 统计信息
+        self.stats = {'added': 0, 'written': 0, 'batches': 0, 'retries': 0, 'failed_batches': 0,
+                      'dropped': 0, 'dead_lettered': 0}
+
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+
+    def add(self, row):
+        """加入一行结果（不阻塞，写出由后台线程完成）"""
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.stats['dropped'] += 1
+            self._buffer.append(row)
+            self.stats['added'] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        """缓冲区中尚未写出的行数"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        把缓冲区全部写出
+        返回：本次成功写出的行数
+        （重试用完的批次放回缓冲区等待下次写出，不可重试的批次移入死信列表）
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._buffer:
+                        break
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+
+                outcome = self._write_with_backoff(batch)
+                if outcome == WRITE_RETRY:
+                    self._requeue(batch)
+                    break
+                if outcome == WRITE_OK:
+                    written += len(batch)
+        return written
+
+    def _requeue(self, batch):
+        """
+        把写出失败的批次放回缓冲区头部
+        写出期间新加入的行可能已占用空间，只放回剩余容量，超出部分按最旧优先丢弃并计数
+        """
+        with self._lock:
+            space = self._buffer.maxlen - len(self._buffer)
+            keep = batch[len(batch) - space:] if space < len(batch) else batch
+            self.stats['dropped'] += len(batch) - len(keep)
+            self._buffer.extendleft(reversed(keep))
+
+    def close(self):
+        """停止后台线程并写出剩余结果"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        """后台线程：缓冲满或超过最长缓冲时间时写出"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._closed:
+                self.flush()
+
+    def _write_with_backoff(self, batch):
+        """
+        写出一批数据，遇到可重试错误时指数退避（带随机抖动）
+        返回：WRITE_OK / WRITE_RETRY / WRITE_REJECTED
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write_rows(batch)
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+                return WRITE_OK
+            except Exception as e:
+                if not self._is_retryable(e):
+                    self.stats['failed_batches'] += 1
+                    self.stats['dead_lettered'] += len(batch)
+                    self.dead_letters.extend((row, repr(e)) for row in batch)
+                    return WRITE_REJECTED
+                if attempt == self.max_retries:
+                    self.stats['failed_batches'] += 1
+                    return WRITE_RETRY
+                self.stats['retries'] += 1
+                delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        return WRITE_RETRY
+
+    def _is_retryable(self, exc):
+        return isinstance(exc, RateLimitError)
+
+    @abc.abstractmethod
+    def _write_rows(self, rows):
+        """写出一批结果行（子类实现）"""
+
+class MemorySink(BufferedSink):
+    """
+    内存替身：记录每次批量写入，可模拟限流
+    fail_first: 前 N 次写入抛出 error（默认 RateLimitError，可重试）
+    write_latency: 每次写入的模拟耗时（秒）
+    """
+
+    def __init__(self, fail_first=0, write_latency=0.0, error=RateLimitError, **kwargs):
+        self.rows = []
+        self.batches = []
+        self.calls = 0
+        self._fail_remaining = fail_first
+        self.error = error
+        self.write_latency = write_latency
+        super().__init__(**kwargs)
+
+    def _write_rows(self, rows):
+        self.calls += 1
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        if self._fail_remaining > 0:
+            self._fail_remaining -= 1
+            raise self.error("模拟写入失败")
+        values = [[row.get(col, "") for col in RESULT_COLUMNS] for row in rows]
+        self.batches.append(values)
+        self.rows.extend(values)
+
+class GoogleSheetsSink(BufferedSink):
+    """通过 gspread 批量写入 Google 表格，整个进程复用一个已授权的客户端和工作表连接"""
+
+    def __init__(self, spreadsheet_key, credentials_file=DEFAULT_CREDENTIALS_FILE,
+                 worksheet_name=DEFAULT_WORKSHEET, **kwargs):
+        self.spreadsheet_key = spreadsheet_key
+        self.credentials_file = credentials_file
+        self.worksheet_name = worksheet_name
+        self._worksheet = None
+        super().__init__(**kwargs)
+
+    def _get_worksheet(self):
+        """首次写入时授权并打开工作表，之后复用同一连接"""
+        if self._worksheet is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(self.credentials_file, GSHEET_SCOPES)
+            client = gspread.authorize(credentials)
+            spreadsheet = client.open_by_key(self.spreadsheet_key)
+            try:
+                worksheet = spreadsheet.worksheet(self.worksheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                worksheet = spreadsheet.add_worksheet(self.worksheet_name, rows=1000, cols=len(RESULT_COLUMNS))
+
+            # 空表先写表头
+            if not worksheet.row_values(1):
+                worksheet.append_row(RESULT_COLUMNS)
+            self._worksheet = worksheet
+        return self._worksheet
+
+    def _write_rows(self, rows):
+        values = [[row.get(col, "") for col in RESULT_COLUMNS] for row in rows]
+        # 按原样写入：姓名等用户输入不能被解析为公式，"3/5"、"83.3%" 也不会被转换为日期或数字
+        self._get_worksheet().append_rows(values, value_input_option="RAW")
+
+    def _is_retryable(self, exc):
+        import gspread
+
+        if isinstance(exc, gspread.exceptions.APIError):
+            status = getattr(exc.response, 'status_code', None)
+            return status == 429 or (status is not None and status >= 500)
+        return isinstance(exc, (RateLimitError, ConnectionError, TimeoutError))
+
+def create_results_sink_from_env():
+    """
+    根据环境变量创建结果写入器
+    返回：GoogleSheetsSink，未配置时返回 None
+    """
+    spreadsheet_key = os.environ.get(GSHEET_KEY_ENV)
+    if not spreadsheet_key:
+        return None
+    return GoogleSheetsSink(
+        spreadsheet_key,
+        credentials_file=os.environ.get(GSHEET_CREDENTIALS_ENV, DEFAULT_CREDENTIALS_FILE),
+        worksheet_name=os.environ.get(GSHEET_WORKSHEET_ENV, DEFAULT_WORKSHEET)
+    )
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 预编译难度路由表
+
+calculate_next_difficulty() 的结果只取决于题号、当前难度和前两题答对数，
+因此把 (题号, 路由状态, 是否答对) → 下一路由状态 预先枚举成一张小表：
+    路由状态 = 难度 * 3 + 前两题答对数（0-2）
+表格由 voca_rules.next_difficulty 逐项生成，规则修改后自动保持一致。
+选题时只需查表得到难度，再从该测试预先打乱的分级题目队列中取出一题。
+
+（完整的 2^25 条答题路径表约 32MB，而路径信息完全包含在上述状态中，
+  这张表只有 (MAX_QUESTIONS+1) × 18 × 2 项。）
+"""
+
+import random
+
+import numpy as np
+
+from voca_rules import (
+    INITIAL_DIFFICULTY,
+    MAX_QUESTIONS,
+    MIN_DIFFICULTY,
+    MAX_DIFFICULTY,
+    next_difficulty,
+)
+
+# ==================== 常量配置 ====================
+FIRST_TWO_STATES = 3                                # 前两题答对数 0/1/2
+N_STATES = (MAX_DIFFICULTY + 1) * FIRST_TWO_STATES  # 路由状态数（难度 0 不使用）
+
+# ==================== 核心函数 - 路由表 ====================
+def encode_state(level, first_two_correct=0):
+    """把难度和前两题答对数编码为路由状态"""
+    return level * FIRST_TWO_STATES + first_two_correct
+
+def state_level(state):
+    """路由状态对应的难度"""
+    return state // FIRST_TWO_STATES
+
+def build_routing_table(max_questions=MAX_QUESTIONS):
+    """
+    枚举难度规则生成路由表
+    返回：int8 数组 table[题号, 状态, 是否答对] = 下一状态（题号从 1 开始）
+    """
+    table = np.zeros((max_questions + 1, N_STATES, 2), dtype=np.int8)
+
+    for question_num in range(1, max_questions + 1):
+        for level in range(MIN_DIFFICULTY, MAX_DIFFICULTY + 1):
+            for first_two_correct in range(FIRST_TWO_STATES):
+                for is_correct in (False, True):
+                    # 构造与页面一致的前两题记录（作答本题后）
+                    if question_num <= 2:
+                        prior = min(first_two_correct, question_num - 1)
+                        first_two_results = [True] * prior + [False] * (question_num - 1 - prior) + [is_correct]
+                    else:
+                        first_two_results = [True] * first_two_correct + [False] * (2 - first_two_correct)
+
+                    new_level = next_difficulty(question_num, level, is_correct, first_two_results)
+                    new_first_two = sum(first_two_results[:2])
+                    table[question_num, encode_state(level, first_two_correct), int(is_correct)] = \
+                        encode_state(new_level, new_first_two)
+
+    return table
+
+# 模块加载时生成一次；ROUTES 为嵌套列表，逐题查表比 NumPy 标量索引更快
+ROUTING_TABLE = build_routing_table()
+ROUTES = ROUTING_TABLE.tolist()
+INITIAL_STATE = encode_state(INITIAL_DIFFICULTY)
+
+def next_state(state, question_num, is_correct):
+    """查表得到作答第 question_num 题后的路由状态"""
+    return ROUTES[question_num][state][1 if is_correct else 0]
+
+def state_from_answers(answers):
+    """按题号顺序重放答题记录，得到当前路由状态"""
+    state = INITIAL_STATE
+    for ans in answers:
+        state = next_state(state, ans['question_num'], ans['is_correct'])
+    return state
+
+# ==================== 核心类 - 分级题目队列 ====================
+class ItemQueues:
+    """
+    每场测试一份预先打乱的分级题目队列
+    取题为队列弹出；目标难度没有剩余题目时，按剩余数量加权从其他难度随机取题
+    """
+
+    def __init__(self, questions, exclude_ids=(), rng=random):
+        self.rng = rng
+        exclude_ids = set(exclude_ids)
+        self.queues = {}
+        for q in questions:
+            if q['id'] not in exclude_ids:
+                self.queues.setdefault(q['difficulty'], []).append(q)
+        for items in self.queues.values():
+            rng.shuffle(items)
+
+    def pop(self, level):
+        """取出一道目标难度的题目，题目全部用完时返回 None"""
+        items = self.queues.get(level)
+        if items:
+            return items.pop()
+
+        remaining = [lv for lv, items in self.queues.items() if items]
+        if not remaining:
+            return None
+        fallback = self.rng.choices(remaining, weights=[len(self.queues[lv]) for lv in remaining])[0]
+        return self.queues[fallback].pop()
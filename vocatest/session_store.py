@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 测试进度检查点（可插拔存储）
+
+每答一题写入一条很小的增量记录（按 test_id 归档），测试进度不再只保存在
+某个进程的 st.session_state 中：任意工作进程都可以根据 test_id 恢复测试，
+负载均衡不需要粘性会话。过期检查点会被定期清理。
+
+- SQLiteCheckpointStore：本地 SQLite（WAL 模式，多进程共享一个文件）
+- FileCheckpointStore：每场测试一个追加写入的 JSON Lines 文件
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from routing import state_from_answers, state_level
+
+# ==================== 常量配置 ====================
+DEFAULT_TTL = 24 * 3600          # 检查点有效期（秒），超过未更新即视为过期
+GC_EVERY_WRITES = 500            # 每写入多少次顺带清理一次过期检查点
+
+# 增量记录中保存的答题字段
+ANSWER_FIELDS = [
+    'question_id', 'question_text', 'user_answer', 'correct_answer',
+    'is_correct', 'difficulty', 'question_num'
+]
+
+# ==================== 核心函数 - 状态重建 ====================
+def rebuild_test_state(answers):
+    """
+    根据按题号排列的答题记录查路由表重放难度规则，重建测试进度
+    返回：可直接写回会话状态的字典
+    """
+    route_state = state_from_answers(answers)
+    question_num = answers[-1]['question_num'] if answers else 0
+
+    return {
+        'current_question_num': question_num + 1,
+        'current_difficulty': state_level(route_state),
+        'route_state': route_state,
+        'used_question_ids': {ans['question_id'] for ans in answers},
+        'user_answers': list(answers),
+        'first_two_results': [ans['is_correct'] for ans in answers if ans['question_num'] <= 2],
+    }
+
+def _compact(answer_record):
+    """只保留需要持久化的字段，序列化为紧凑 JSON"""
+    return json.dumps(
+        {key: answer_record[key] for key in ANSWER_FIELDS if key in answer_record},
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+# ==================== 核心类 - 检查点存储 ====================
+class CheckpointStore(abc.ABC):
+    """
+    检查点存储接口
+    load() 返回 {'test_id', 'user_name', 'user_token', 'completed', 'answers'}，不存在或已过期返回 None
+    user_token 为该测试的历史成绩令牌（没有时为 None），在其他进程恢复的测试仍归档到同一用户
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._writes = 0
+
+    @abc.abstractmethod
+    def start_test(self, test_id, user_name, user_token=None):
+        """创建测试（已存在时清空原有记录）"""
+
+    @abc.abstractmethod
+    def append_answer(self, test_id, answer_record):
+        """追加一条答题记录"""
+
+    @abc.abstractmethod
+    def complete_test(self, test_id):
+        """标记测试已完成"""
+
+    @abc.abstractmethod
+    def load(self, test_id):
+        """读取检查点"""
+
+    @abc.abstractmethod
+    def purge_expired(self, now=None):
+        """删除过期检查点，返回删除的测试数"""
+
+    def _maybe_gc(self):
+        """按写入次数顺带清理过期检查点"""
+        self._writes += 1
+        if self._writes % GC_EVERY_WRITES == 0:
+            self.purge_expired()
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """SQLite 检查点存储，每个线程使用自己的连接"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tests (
+                    test_id TEXT PRIMARY KEY,
+                    user_name TEXT NOT NULL,
+                    user_token TEXT,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tests_updated ON tests(updated_at);
+                CREATE TABLE IF NOT EXISTS answers (
+                    test_id TEXT NOT NULL,
+                    question_num INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (test_id, question_num)
+                ) WITHOUT ROWID;
+            """)
+            # 旧版数据库没有 user_token 列
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(tests)")]
+            if 'user_token' not in columns:
+                conn.execute("ALTER TABLE tests ADD COLUMN user_token TEXT")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def start_test(self, test_id, user_name, user_token=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tests (test_id, user_name, user_token, completed, updated_at) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (test_id, user_name, user_token, time.time())
+            )
+            conn.execute("DELETE FROM answers WHERE test_id = ?", (test_id,))
+        self._maybe_gc()
+
+    def append_answer(self, test_id, answer_record):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (test_id, question_num, record) VALUES (?, ?, ?)",
+                (test_id, answer_record['question_num'], _compact(answer_record))
+            )
+            conn.execute("UPDATE tests SET updated_at = ? WHERE test_id = ?", (time.time(), test_id))
+        self._maybe_gc()
+
+    def complete_test(self, test_id):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tests SET completed = 1, updated_at = ? WHERE test_id = ?",
+                (time.time(), test_id)
+            )
+
+    def load(self, test_id):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT user_name, user_token, completed, updated_at FROM tests WHERE test_id = ?", (test_id,)
+        ).fetchone()
+        if row is None or row[3] < time.time() - self.ttl:
+            return None
+        records = conn.execute(
+            "SELECT record FROM answers WHERE test_id = ? ORDER BY question_num", (test_id,)
+        ).fetchall()
+        return {
+            'test_id': test_id,
+            'user_name': row[0],
+            'user_token': row[1],
+            'completed': bool(row[2]),
+            'answers': [json.loads(record) for (record,) in records],
+        }
+
+    def purge_expired(self, now=None):
+        """删除过期检查点，返回删除的测试数"""
+        cutoff = (now or time.time()) - self.ttl
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM answers WHERE test_id IN (SELECT test_id FROM tests WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            return conn.execute("DELETE FROM tests WHERE updated_at < ?", (cutoff,)).rowcount
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    文件检查点存储：每场测试一个 JSON Lines 文件
+    第一行为测试信息，之后每行一条答题增量，完成时追加一行完成标记
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL):
+        super().__init__(ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, test_id):
+        safe_id = "".join(ch for ch in test_id if ch.isalnum() or ch in "-_")
+        return os.path.join(self.directory, f"{safe_id}.jsonl")
+
+    def _append(self, test_id, entry, mode='a'):
+        with open(self._path(test_id), mode, encoding='utf-8') as f:
+            f.write(entry + "\n")
+
+    def start_test(self, test_id, user_name, user_token=None):
+        header = json.dumps({'test_id': test_id, 'user_name': user_name, 'user_token': user_token},
+                            ensure_ascii=False)
+        self._append(test_id, header, mode='w')
+        self._maybe_gc()
+
+    def append_answer(self, test_id, answer_record):
+        self._append(test_id, _compact(answer_record))
+        self._maybe_gc()
+
+    def complete_test(self, test_id):
+        # 测试不存在（或已被清理）时不创建文件，与 SQLite 存储一致
+        if not os.path.exists(self._path(test_id)):
+            return
+        self._append(test_id, json.dumps({'completed': True}))
+
+    def load(self, test_id):
+        path = self._path(test_id)
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                return None
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return None
+        if not lines:
+            return None
+
+        # 同一题号以最后一次写入为准
+        answers = {}
+        completed = False
+        for entry in lines[1:]:
+            if entry.get('completed'):
+                completed = True
+            else:
+                answers[entry['question_num']] = entry
+        return {
+            'test_id': test_id,
+            'user_name': lines[0].get('user_name', ""),
+            'user_token': lines[0].get('user_token'),
+            'completed': completed,
+            'answers': [answers[num] for num in sorted(answers)],
+        }
+
+    def purge_expired(self, now=None):
+        """删除过期检查点文件，返回删除的测试数"""
+        cutoff = (now or time.time()) - self.ttl
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith('.jsonl') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 各模块以脚本目录为导入路径（python vocaapp.py / python batch_scoring.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
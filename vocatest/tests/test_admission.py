@@ -0,0 +1,108 @@
+"""准入控制：名额上限、先来后到、排队超时和放行后认领"""
+
+import pytest
+
+import admission
+from admission import AdmissionController
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+def make_controller(max_active=2):
+    return AdmissionController(max_active=max_active, active_ttl=600, queue_ttl=60, claim_ttl=30)
+
+def test_cap_and_fifo(clock):
+    controller = make_controller()
+    assert controller.request("a") == (True, 0)
+    assert controller.request("b") == (True, 0)
+    assert controller.request("c") == (False, 1)
+    assert controller.request("d") == (False, 2)
+    # 重复刷新不改变排队顺序
+    assert controller.request("c") == (False, 1)
+
+    controller.release("a")
+    assert controller.request("d") == (False, 1)
+    assert controller.request("c") == (True, 0)
+    controller.release("b")
+    assert controller.request("d") == (True, 0)
+
+def test_queue_expiry_on_release(clock):
+    controller = make_controller(max_active=1)
+    controller.request("a")
+    controller.request("b")
+
+    # b 已离开超过 queue_ttl，a 完成时不应把名额放行给 b
+    clock.now += 61
+    controller.release("a")
+    metrics = controller.metrics()
+    assert metrics['active'] == 0
+    assert metrics['queued'] == 0
+
+def test_unclaimed_slot_is_released(clock):
+    controller = make_controller(max_active=1)
+    controller.request("a")
+    controller.request("b")
+    controller.request("c")
+
+    # b 在 queue_ttl 内刷新过，放行后未认领，claim_ttl 后名额转给 c
+    clock.now += 20
+    controller.request("c")
+    controller.release("a")
+    assert controller.metrics()['unclaimed'] == 1
+    clock.now += 31
+    assert controller.request("c") == (True, 0)
+    assert controller.touch("b") is False
+    assert controller.metrics()['expired_total'] == 1
+
+def test_claimed_slot_is_kept(clock):
+    controller = make_controller(max_active=1)
+    controller.request("a")
+    controller.request("b")
+    controller.release("a")
+    clock.now += 10
+    assert controller.request("b") == (True, 0)
+
+    clock.now += 300
+    assert controller.touch("b") is True
+    assert controller.metrics()['active'] == 1
+
+def test_touch_does_not_admit(clock):
+    controller = make_controller(max_active=1)
+    assert controller.touch("a") is False
+    controller.request("a")
+    assert controller.touch("a") is True
+
+    # 长时间无操作后名额被释放，touch 不会重新占用
+    clock.now += 601
+    assert controller.touch("a") is False
+    assert controller.metrics()['active'] == 0
+    controller.request("b")
+    assert controller.touch("a") is False
+    assert controller.request("a") == (False, 1)
+
+def test_metrics(clock):
+    controller = make_controller(max_active=1)
+    controller.request("a")
+    controller.request("b")
+    controller.request("c")
+    controller.release("a")
+
+    assert controller.metrics() == {
+        'active': 1,
+        'queued': 1,
+        'unclaimed': 1,
+        'max_active': 1,
+        'admitted_total': 2,
+        'completed_total': 1,
+        'expired_total': 0,
+    }
@@ -0,0 +1,53 @@
+"""统计汇总表：各等级掌握度只计入作答过该等级的测试"""
+
+import pandas as pd
+import pytest
+
+from analytics import AnalyticsStore, backfill_from_csv
+from results_sink import format_result_row
+from voca_rules import compute_results
+
+def make_results(test_id, answers):
+    return {
+        'test_id': test_id,
+        'user_name': "u",
+        'test_date': "2026-01-02 03:04:05",
+        **compute_results(answers, final_difficulty=3),
+        'answers': answers,
+    }
+
+def answer(question_id, difficulty, is_correct):
+    return {'question_id': question_id, 'difficulty': difficulty, 'is_correct': is_correct}
+
+def test_level_mastery_counts_attempted_levels_only(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics.db"))
+    store.record_result(make_results("A", [answer("q1", 3, True), answer("q2", 3, False), answer("q3", 4, True)]))
+    store.record_result(make_results("B", [answer("q1", 3, True)]))
+
+    mastery = store.level_mastery().set_index('level')
+
+    assert list(mastery.index) == [3, 4]
+    assert mastery.at[3, 'tests'] == 2
+    assert mastery.at[3, 'avg_mastery'] == pytest.approx(75.0)
+    assert mastery.at[3, 'question_accuracy'] == pytest.approx(200 / 3)
+    assert mastery.at[4, 'avg_mastery'] == pytest.approx(100.0)
+    assert mastery['approximate_tests'].sum() == 0
+
+def test_backfill_is_marked_approximate(tmp_path):
+    rows = [
+        format_result_row(make_results("A", [answer("q1", 2, True), answer("q2", 3, False)])),
+        format_result_row(make_results("B", [answer("q1", 2, False), answer("q3", 3, True)])),
+    ]
+    results_file = tmp_path / "results.csv"
+    pd.DataFrame(rows).to_csv(results_file, index=False, encoding='utf-8-sig')
+    store = AnalyticsStore(str(tmp_path / "analytics.db"))
+
+    assert backfill_from_csv(store, results_file) == 2
+
+    # CSV 中全部答错的等级与未作答无法区分，只计入掌握度大于 0 的等级
+    mastery = store.level_mastery().set_index('level')
+    assert list(mastery.index) == [2, 3]
+    assert (mastery['tests'] == 1).all()
+    assert (mastery['approximate_tests'] == 1).all()
+    assert mastery['question_accuracy'].isna().all()
+    assert store.totals()['tests'] == 2
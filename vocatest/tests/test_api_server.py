@@ -0,0 +1,153 @@
+"""HTTP 接口：请求解析错误、内部错误、存储操作不阻塞事件循环、完成测试的结果保存和跨进程恢复"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+
+from analytics import AnalyticsStore
+import api_server
+from result_recorder import ResultRecorder
+from session_store import SQLiteCheckpointStore
+from user_history import HistoryStore
+from voca_rules import MAX_QUESTIONS
+
+QUESTIONS = [
+    {'id': f"Q{level}_{i}", 'question': f"word {level}-{i}", 'options': ["a", "b", "c", "d"],
+     'correct': 0, 'difficulty': level}
+    for level in range(1, 6) for i in range(MAX_QUESTIONS)
+]
+
+async def exchange(port, raw_requests):
+    """在一个新连接上依次发送原始请求，返回 [(状态码, 响应数据)]"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    for raw in raw_requests:
+        writer.write(raw)
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        except asyncio.IncompleteReadError:
+            responses.append(None)
+            break
+        lines = head.decode('latin-1').split("\r\n")
+        length = int([l for l in lines if l.lower().startswith("content-length:")][0].split(":", 1)[1])
+        responses.append((int(lines[0].split(" ")[1]), json.loads(await reader.readexactly(length))))
+    writer.close()
+    return responses
+
+def run_exchange(engine, raw_requests):
+    """启动服务器，在一个连接上依次发送原始请求，返回 [(状态码, 响应数据)]"""
+    async def main():
+        server = await asyncio.start_server(lambda r, w: api_server.handle_connection(engine, r, w), "127.0.0.1", 0)
+        responses = await exchange(server.sockets[0].getsockname()[1], raw_requests)
+        server.close()
+        await server.wait_closed()
+        return responses
+    return asyncio.run(main())
+
+def request(method, path, payload=None, content_length=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+    length = len(body) if content_length is None else content_length
+    return f"{method} {path} HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode('latin-1') + body
+
+def test_invalid_content_length_returns_400():
+    for value in ("abc", "-5"):
+        responses = run_exchange(api_server.TestEngine(QUESTIONS), [request("POST", "/tests", content_length=value)])
+        assert responses[0][0] == 400
+
+def test_unexpected_error_returns_500():
+    class BrokenStore:
+        def start_test(self, test_id, user_name, user_token=None):
+            raise sqlite3.OperationalError("database is locked")
+
+    engine = api_server.TestEngine(QUESTIONS, checkpoint_store=BrokenStore())
+    responses = run_exchange(engine, [
+        request("POST", "/tests", {'user_name': "Alice"}),
+        request("GET", "/health"),
+    ])
+    assert responses[0] == (500, {'error': "服务器内部错误"})
+    # 连接保持可用
+    assert responses[1][0] == 200
+
+def test_slow_storage_does_not_block_other_connections():
+    release = threading.Event()
+
+    class SlowStore:
+        def start_test(self, test_id, user_name, user_token=None):
+            release.wait(5)
+
+    engine = api_server.TestEngine(QUESTIONS, checkpoint_store=SlowStore())
+
+    async def main():
+        server = await asyncio.start_server(lambda r, w: api_server.handle_connection(engine, r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        creating = asyncio.create_task(exchange(port, [request("POST", "/tests", {'user_name': "Alice"})]))
+        await asyncio.sleep(0.1)
+        # 写检查点期间事件循环仍可处理其他连接
+        health = await asyncio.wait_for(exchange(port, [request("GET", "/health")]), 2)
+        still_waiting = not creating.done()
+        release.set()
+        created = await creating
+        server.close()
+        await server.wait_closed()
+        return health, still_waiting, created
+
+    health, still_waiting, created = asyncio.run(main())
+    engine.close()
+    assert health == [(200, {'status': 'ok', 'bank_fingerprint': "", 'sessions': 0})]
+    assert still_waiting
+    assert created[0][0] == 201
+    assert list(engine.sessions) == [created[0][1]['test_id']]
+
+def test_finished_test_is_recorded_once(tmp_path):
+    results_file = tmp_path / "results.csv"
+    history = HistoryStore(str(tmp_path / "history.db"))
+    analytics = AnalyticsStore(str(tmp_path / "analytics.db"))
+    engine = api_server.TestEngine(QUESTIONS, recorder=ResultRecorder(str(results_file), history, analytics))
+
+    async def take_test():
+        test_id = await engine.start_test("Alice")
+        for _ in range(MAX_QUESTIONS):
+            question = await engine.next_question(test_id)
+            await engine.submit_answer(test_id, question['question_id'], question['options'][0])
+        return test_id
+
+    test_id = asyncio.run(take_test())
+
+    # 最后一题作答后即保存，客户端不需要再请求结果
+    saved = pd.read_csv(results_file, encoding='utf-8-sig')
+    assert list(saved['test_id']) == [test_id]
+    assert saved.at[0, 'total_questions'] == MAX_QUESTIONS
+
+    results = asyncio.run(engine.get_results(test_id))
+    asyncio.run(engine.get_results(test_id))
+    assert len(pd.read_csv(results_file, encoding='utf-8-sig')) == 1
+    assert list(history.get_history(results['user_token'])['test_id']) == [test_id]
+    assert history.get_history("Alice").empty
+    assert analytics.totals()['tests'] == 1
+    assert results['correct_count'] == MAX_QUESTIONS
+
+def test_resumed_test_keeps_user_token(tmp_path):
+    """在一个进程开始、在另一个进程完成的测试仍归档到同一用户"""
+    history = HistoryStore(str(tmp_path / "history.db"))
+    checkpoint_db = str(tmp_path / "checkpoints.db")
+    first = api_server.TestEngine(QUESTIONS, SQLiteCheckpointStore(checkpoint_db))
+    second = api_server.TestEngine(QUESTIONS, SQLiteCheckpointStore(checkpoint_db),
+                                   recorder=ResultRecorder(str(tmp_path / "results.csv"), history))
+
+    async def take_test():
+        test_id = await first.start_test("Alice", "token_0123456789abcdef")
+        question = await first.next_question(test_id)
+        await first.submit_answer(test_id, question['question_id'], question['options'][0])
+        for _ in range(MAX_QUESTIONS - 1):
+            question = await second.next_question(test_id)
+            await second.submit_answer(test_id, question['question_id'], question['options'][0])
+        return await second.get_results(test_id)
+
+    results = asyncio.run(take_test())
+    first.close()
+    second.close()
+    assert results['user_token'] == "token_0123456789abcdef"
+    assert list(history.get_history("token_0123456789abcdef")['test_id']) == [results['test_id']]
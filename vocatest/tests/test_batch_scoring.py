@@ -0,0 +1,107 @@
+"""批量评分与页面评分规则（compute_results / next_difficulty）的一致性"""
+
+import random
+
+import pandas as pd
+import pytest
+
+from batch_scoring import score_answer_sheets, score_file
+from voca_rules import INITIAL_DIFFICULTY, MAX_QUESTIONS, compute_results, next_difficulty
+
+LEVELS = range(1, 6)
+
+def simulate_test(rng, n_questions):
+    """按页面流程逐题作答，返回 (答题记录, 最终难度)；偶尔模拟目标难度题目用完"""
+    difficulty = INITIAL_DIFFICULTY
+    first_two_results = []
+    answers = []
+    for question_num in range(1, n_questions + 1):
+        shown = difficulty if rng.random() > 0.1 else rng.choice(LEVELS)
+        is_correct = rng.random() < 0.55
+        answers.append({
+            'question_id': f"L{shown}_{rng.randrange(1000)}",
+            'is_correct': is_correct,
+            'difficulty': shown,
+            'question_num': question_num,
+        })
+        if question_num <= 2:
+            first_two_results.append(is_correct)
+        difficulty = next_difficulty(question_num, difficulty, is_correct, first_two_results)
+    return answers, difficulty
+
+def random_sheets(seed, n_tests):
+    rng = random.Random(seed)
+    expected = {}
+    rows = []
+    for i in range(n_tests):
+        test_id = f"T{i:05d}"
+        answers, final_difficulty = simulate_test(rng, rng.choice([1, 2, 3, 4, MAX_QUESTIONS, MAX_QUESTIONS]))
+        expected[test_id] = compute_results(answers, final_difficulty)
+        rows.extend({'test_id': test_id, **ans} for ans in answers)
+    return pd.DataFrame(rows), expected
+
+def assert_matches(row, expected):
+    for key in ('total_questions', 'correct_count', 'total_score', 'max_score', 'final_difficulty', 'suggestion'):
+        assert row[key] == expected[key], key
+    for key in ('accuracy', 'score_percentage', 'vocabulary_increment', 'total_vocabulary'):
+        assert row[key] == expected[key], key
+    for level in LEVELS:
+        stats = expected['difficulty_stats'][level]
+        assert row[f'level{level}_total'] == stats['total']
+        assert row[f'level{level}_correct'] == stats['correct']
+        assert row[f'level{level}_mastery'] == stats['accuracy']
+
+@pytest.mark.parametrize("with_difficulty", [True, False])
+def test_matches_compute_results(with_difficulty):
+    answers, expected = random_sheets(seed=26, n_tests=3000)
+    if not with_difficulty:
+        answers = answers.drop(columns=['difficulty'])
+
+    scored = score_answer_sheets(answers)
+
+    assert list(scored['test_id']) == list(expected)
+    for row in scored.to_dict('records'):
+        assert_matches(row, expected[row['test_id']])
+
+def test_question_num_orders_replay():
+    answers, expected = random_sheets(seed=27, n_tests=500)
+    shuffled = answers.sample(frac=1, random_state=0)
+
+    scored = score_answer_sheets(shuffled).set_index('test_id')
+
+    for test_id, stats in expected.items():
+        assert scored.at[test_id, 'final_difficulty'] == stats['final_difficulty']
+
+def test_difficulty_map():
+    answers = pd.DataFrame({
+        'test_id': ["A", "A", "B"],
+        'question_id': ["Qx", "Qy", "Qx"],
+        'is_correct': [1, 0, "true"],
+    })
+    scored = score_answer_sheets(answers, {'Qx': 2, 'Qy': 5}).set_index('test_id')
+    assert scored.at['A', 'max_score'] == 7
+    assert scored.at['A', 'total_score'] == 2
+    assert scored.at['B', 'correct_count'] == 1
+
+    with pytest.raises(ValueError):
+        score_answer_sheets(answers, {'Qx': 2})
+
+@pytest.mark.parametrize("chunksize", [1, 7, 25, 26, 1000])
+def test_score_file_chunks(tmp_path, chunksize):
+    answers, expected = random_sheets(seed=28, n_tests=300)
+    source = tmp_path / "answers.csv"
+    output = tmp_path / "scored.csv"
+    answers.to_csv(source, index=False)
+
+    total = score_file(source, output, chunksize=chunksize)
+    scored = pd.read_csv(output, encoding='utf-8-sig')
+
+    # 跨块的测试不能被拆分或重复
+    assert total == len(expected)
+    assert scored['test_id'].is_unique
+    assert list(scored['test_id']) == list(expected)
+    for row in scored.to_dict('records'):
+        stats = expected[row['test_id']]
+        assert row['total_questions'] == stats['total_questions']
+        assert row['final_difficulty'] == stats['final_difficulty']
+        assert row['total_vocabulary'] == pytest.approx(stats['total_vocabulary'])
@@ -0,0 +1,84 @@
+"""题库构建：内容哈希题目ID、按工作表增量重建、重复题目检测"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import question_bank
+from question_bank import SHEET_NAMES, build_question_bank, question_content_id
+
+def row(word, correct="A"):
+    return {'question': f"“{word}”对应的英文是：", 'correct_option': correct,
+            'option_a': word, 'option_b': "other", 'option_c': "", 'option_d': ""}
+
+def write_bank(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name in SHEET_NAMES:
+            pd.DataFrame(sheets.get(name, [row(f"{name}-word")])).to_excel(writer, sheet_name=name, index=False)
+    # 保证修改时间变化（文件缓存以修改时间和大小为键）
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    question_bank._sheet_cache.clear()
+    question_bank._file_cache.clear()
+
+def ids_by_question(bank):
+    return {q['question']: q['id'] for q in bank['questions']}
+
+def test_ids_survive_row_insertion(tmp_path):
+    path = tmp_path / "bank.xlsx"
+    write_bank(path, {"高中": [row("apple"), row("banana")]})
+    before = ids_by_question(build_question_bank(path))
+
+    write_bank(path, {"高中": [row("cherry"), row("apple"), row("banana")]})
+    bank = build_question_bank(path)
+    after = ids_by_question(bank)
+
+    for question, qid in before.items():
+        assert after[question] == qid
+    apple = [q for q in bank['questions'] if q['question'] == row("apple")['question']][0]
+    assert apple['row'] == 3
+    assert apple['id'] == question_content_id(apple['question'], apple['options'], apple['correct'])
+
+def test_only_edited_sheets_are_rebuilt(tmp_path):
+    path = tmp_path / "bank.xlsx"
+    write_bank(path, {})
+    first = build_question_bank(path)
+    assert first['rebuilt_sheets'] == SHEET_NAMES
+
+    # 文件未修改时直接返回缓存结果
+    assert build_question_bank(path) is first
+
+    write_bank(path, {"四六级": [row("changed")]})
+    second = build_question_bank(path)
+    assert second['rebuilt_sheets'] == ["四六级"]
+    assert second['fingerprint'] != first['fingerprint']
+    assert {k: v for k, v in second['sheets'].items() if k != "四六级"} == \
+        {k: v for k, v in first['sheets'].items() if k != "四六级"}
+
+def test_duplicates_are_reported_and_first_copy_kept(tmp_path):
+    path = tmp_path / "bank.xlsx"
+    write_bank(path, {
+        "小学初中": [row("apple"), row("pear"), row("apple")],
+        "高中": [row("orange"), row("apple")],
+    })
+    bank = build_question_bank(path)
+
+    apples = [q for q in bank['questions'] if q['question'] == row("apple")['question']]
+    assert len(apples) == 1
+    assert (apples[0]['sheet_name'], apples[0]['row'], apples[0]['difficulty']) == ("小学初中", 2, 1)
+
+    assert len(bank['duplicates']) == 1
+    duplicate = bank['duplicates'][0]
+    assert duplicate['id'] == apples[0]['id']
+    assert duplicate['locations'] == ["小学初中#2", "小学初中#4", "高中#3"]
+
+def test_same_word_with_different_answer_is_not_duplicate(tmp_path):
+    path = tmp_path / "bank.xlsx"
+    write_bank(path, {"高中": [row("apple", "A"), row("apple", "B")]})
+    bank = build_question_bank(path)
+    assert bank['duplicates'] == []
+    assert len([q for q in bank['questions'] if q['sheet_name'] == "高中"]) == 2
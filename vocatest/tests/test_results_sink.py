@@ -0,0 +1,165 @@
+"""结果缓冲写入：批量大小、退避重试、缓冲区溢出和关闭时写出"""
+
+import time
+
+import pytest
+
+import results_sink
+from results_sink import RESULT_COLUMNS, BufferedSink, GoogleSheetsSink, MemorySink
+
+def make_sink(**kwargs):
+    kwargs.setdefault('background', False)
+    kwargs.setdefault('backoff_base', 0.0)
+    return MemorySink(**kwargs)
+
+def row(n):
+    return {'test_id': f"T{n}", 'user_name': "u"}
+
+def written_ids(sink):
+    return [values[0] for values in sink.rows]
+
+def test_batch_sizes():
+    sink = make_sink(batch_size=4)
+    for n in range(10):
+        sink.add(row(n))
+
+    assert sink.flush() == 10
+    assert [len(batch) for batch in sink.batches] == [4, 4, 2]
+    assert written_ids(sink) == [f"T{n}" for n in range(10)]
+    assert sink.pending() == 0
+    assert sink.stats['batches'] == 3
+
+def test_retries_with_exponential_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(results_sink.time, "sleep", delays.append)
+    sink = make_sink(fail_first=3, batch_size=10, backoff_base=1.0, backoff_max=3.0)
+    sink.add(row(0))
+
+    assert sink.flush() == 1
+    assert sink.calls == 4
+    assert sink.stats['retries'] == 3
+    assert sink.stats['failed_batches'] == 0
+    # 每次等待 [0.5, 1] × min(base × 2^n, max)
+    for delay, cap in zip(delays, [1.0, 2.0, 3.0]):
+        assert cap * 0.5 <= delay <= cap
+
+def test_exhausted_retries_requeue_batch():
+    sink = make_sink(fail_first=3, max_retries=2, batch_size=2)
+    for n in range(3):
+        sink.add(row(n))
+
+    assert sink.flush() == 0
+    assert sink.stats['failed_batches'] == 1
+    assert sink.pending() == 3
+
+    assert sink.flush() == 3
+    assert written_ids(sink) == ["T0", "T1", "T2"]
+
+def test_add_overflow_drops_oldest():
+    sink = make_sink(max_buffer=3)
+    for n in range(5):
+        sink.add(row(n))
+
+    assert sink.stats['dropped'] == 2
+    sink.flush()
+    assert written_ids(sink) == ["T2", "T3", "T4"]
+
+def test_requeue_overflow_is_counted():
+    class BusySink(MemorySink):
+        """第一次写出期间有新结果到达"""
+
+        def _write_rows(self, rows):
+            if self.calls == 0:
+                for n in range(5, 8):
+                    self.add(row(n))
+            super()._write_rows(rows)
+
+    sink = BusySink(fail_first=1, max_retries=0, batch_size=3, max_buffer=5, background=False)
+    for n in range(5):
+        sink.add(row(n))
+
+    assert sink.flush() == 0
+    # 缓冲区剩 T3-T7，失败批次 T0-T2 已无空间放回
+    assert sink.pending() == 5
+    assert sink.stats['dropped'] == 3
+    assert sink.stats['added'] - sink.stats['dropped'] == sink.pending()
+
+    sink.flush()
+    assert written_ids(sink) == [f"T{n}" for n in range(3, 8)]
+
+def test_partial_requeue_keeps_newest_of_batch():
+    class BusySink(MemorySink):
+        def _write_rows(self, rows):
+            if self.calls == 0:
+                self.add(row(9))
+            super()._write_rows(rows)
+
+    sink = BusySink(fail_first=1, max_retries=0, batch_size=3, max_buffer=3, background=False)
+    for n in range(3):
+        sink.add(row(n))
+
+    sink.flush()
+    assert sink.stats['dropped'] == 1
+    sink.flush()
+    assert written_ids(sink) == ["T1", "T2", "T9"]
+
+def test_non_retryable_batch_goes_to_dead_letters():
+    sink = make_sink(fail_first=1, error=ValueError, batch_size=2)
+    for n in range(5):
+        sink.add(row(n))
+
+    # 不可重试的批次不重试，也不阻塞后续结果
+    assert sink.flush() == 3
+    assert sink.stats['retries'] == 0
+    assert sink.stats['dead_lettered'] == 2
+    assert [r['test_id'] for r, _ in sink.dead_letters] == ["T0", "T1"]
+    assert written_ids(sink) == ["T2", "T3", "T4"]
+    assert sink.pending() == 0
+
+def test_close_flushes_remaining():
+    sink = MemorySink(batch_size=100, flush_interval=60)
+    for n in range(7):
+        sink.add(row(n))
+    sink.close()
+
+    assert sink.pending() == 0
+    assert written_ids(sink) == [f"T{n}" for n in range(7)]
+
+def test_background_flush_on_full_batch():
+    sink = MemorySink(batch_size=5, flush_interval=60)
+    for n in range(5):
+        sink.add(row(n))
+
+    # 缓冲达到批量大小时后台线程立即写出，不等待 flush_interval
+    deadline = time.monotonic() + 5
+    while sink.stats['written'] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.stats['written'] == 5
+    sink.close()
+
+def test_subclass_must_implement_write_rows():
+    class Incomplete(BufferedSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(background=False)
+
+def test_google_sheets_rows_are_written_raw():
+    class FakeWorksheet:
+        def __init__(self):
+            self.calls = []
+
+        def append_rows(self, values, **kwargs):
+            self.calls.append((values, kwargs))
+
+    worksheet = FakeWorksheet()
+    sink = GoogleSheetsSink("sheet-key", background=False)
+    sink._worksheet = worksheet
+    sink.add({'test_id': "T1", 'user_name': '=IMPORTXML("http://x", "//a")', 'total_score': "3/5"})
+    sink.flush()
+
+    # 用户输入不能作为公式执行，分数和百分比不能被转换
+    values, kwargs = worksheet.calls[0]
+    assert kwargs['value_input_option'] == "RAW"
+    assert values[0][RESULT_COLUMNS.index('user_name')] == '=IMPORTXML("http://x", "//a")'
+    assert values[0][RESULT_COLUMNS.index('total_score')] == "3/5"
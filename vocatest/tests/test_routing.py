@@ -0,0 +1,76 @@
+"""预编译路由表与难度规则（next_difficulty）的一致性"""
+
+import itertools
+import random
+
+from routing import (
+    INITIAL_STATE,
+    ItemQueues,
+    build_routing_table,
+    next_state,
+    state_from_answers,
+    state_level,
+)
+from voca_rules import INITIAL_DIFFICULTY, MAX_QUESTIONS, next_difficulty
+
+def test_every_reachable_configuration():
+    """
+    逐题枚举所有可达的 (难度, 前两题对错) 组合并检查两个分支；
+    任意答题路径都由这些组合串联而成，因此覆盖全部 2^25 条路径
+    """
+    frontier = {(INITIAL_DIFFICULTY, ()): INITIAL_STATE}
+    for question_num in range(1, MAX_QUESTIONS + 1):
+        following = {}
+        for (difficulty, first_two), state in frontier.items():
+            assert state_level(state) == difficulty
+            for is_correct in (False, True):
+                results = first_two + (is_correct,) if question_num <= 2 else first_two
+                expected = next_difficulty(question_num, difficulty, is_correct, list(results))
+                new_state = next_state(state, question_num, is_correct)
+                assert state_level(new_state) == expected, (question_num, difficulty, first_two, is_correct)
+
+                key = (expected, results)
+                assert following.setdefault(key, new_state) == new_state
+        frontier = following
+
+def test_all_short_paths():
+    """前 12 题的全部答题路径逐条重放"""
+    for path in itertools.product((False, True), repeat=12):
+        difficulty, first_two, state = INITIAL_DIFFICULTY, [], INITIAL_STATE
+        for question_num, is_correct in enumerate(path, 1):
+            if question_num <= 2:
+                first_two.append(is_correct)
+            difficulty = next_difficulty(question_num, difficulty, is_correct, first_two)
+            state = next_state(state, question_num, is_correct)
+            assert state_level(state) == difficulty
+
+def test_state_from_answers():
+    rng = random.Random(33)
+    for _ in range(2000):
+        n_questions = rng.randint(0, MAX_QUESTIONS)
+        answers = [{'question_num': num, 'is_correct': rng.random() < 0.5} for num in range(1, n_questions + 1)]
+
+        difficulty, first_two = INITIAL_DIFFICULTY, []
+        for ans in answers:
+            if ans['question_num'] <= 2:
+                first_two.append(ans['is_correct'])
+            difficulty = next_difficulty(ans['question_num'], difficulty, ans['is_correct'], first_two)
+
+        assert state_level(state_from_answers(answers)) == difficulty
+
+def test_longer_table_extends_rule():
+    table = build_routing_table(MAX_QUESTIONS + 10)
+    assert (table[:MAX_QUESTIONS + 1] == build_routing_table()).all()
+
+def test_item_queues():
+    questions = [{'id': f"{level}-{i}", 'difficulty': level} for level in (1, 2, 3) for i in range(4)]
+    queues = ItemQueues(questions, exclude_ids={"3-0"}, rng=random.Random(0))
+
+    taken = [queues.pop(3) for _ in range(3)]
+    assert sorted(q['id'] for q in taken) == ["3-1", "3-2", "3-3"]
+
+    # 目标难度用完后从其他难度取题，全部用完返回 None
+    rest = [queues.pop(3) for _ in range(8)]
+    assert {q['difficulty'] for q in rest} == {1, 2}
+    assert len({q['id'] for q in taken + rest}) == 11
+    assert queues.pop(3) is None
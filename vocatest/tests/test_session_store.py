@@ -0,0 +1,122 @@
+"""测试进度检查点：两种存储的行为一致，状态重建与页面流程一致"""
+
+import sqlite3
+import time
+
+import pytest
+
+import session_store
+from session_store import FileCheckpointStore, SQLiteCheckpointStore, rebuild_test_state
+from voca_rules import INITIAL_DIFFICULTY, next_difficulty
+
+TTL = 3600
+
+@pytest.fixture(params=["sqlite", "file"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"), ttl=TTL)
+    return FileCheckpointStore(str(tmp_path / "checkpoints"), ttl=TTL)
+
+def answer(question_num, is_correct, difficulty=3):
+    return {
+        'question_id': f"Q{question_num}",
+        'question_text': f"word {question_num}",
+        'user_answer': "a",
+        'correct_answer': "a" if is_correct else "b",
+        'is_correct': is_correct,
+        'difficulty': difficulty,
+        'question_num': question_num,
+        'extra': "不保存",
+    }
+
+def test_round_trip(store):
+    store.start_test("T1", "Alice")
+    for num, is_correct in enumerate([True, False, True], 1):
+        store.append_answer("T1", answer(num, is_correct))
+
+    checkpoint = store.load("T1")
+    assert checkpoint['user_name'] == "Alice"
+    assert not checkpoint['completed']
+    assert [ans['question_num'] for ans in checkpoint['answers']] == [1, 2, 3]
+    assert [ans['is_correct'] for ans in checkpoint['answers']] == [True, False, True]
+    assert 'extra' not in checkpoint['answers'][0]
+
+def test_rewritten_answer_and_restart(store):
+    store.start_test("T1", "Alice")
+    store.append_answer("T1", answer(1, False))
+    store.append_answer("T1", answer(1, True))
+    assert [ans['is_correct'] for ans in store.load("T1")['answers']] == [True]
+
+    # 同一 test_id 重新开始时清空原有记录
+    store.start_test("T1", "Alice")
+    assert store.load("T1")['answers'] == []
+
+def test_user_token_round_trip(store):
+    store.start_test("T1", "Alice", "token_0123456789abcdef")
+    store.start_test("T2", "Bob")
+    assert store.load("T1")['user_token'] == "token_0123456789abcdef"
+    assert store.load("T2")['user_token'] is None
+
+def test_sqlite_adds_user_token_column(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE tests (test_id TEXT PRIMARY KEY, user_name TEXT NOT NULL,
+                                completed INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)
+        """)
+        conn.execute("INSERT INTO tests VALUES ('T_old', 'Alice', 0, ?)", (time.time(),))
+    conn.close()
+
+    store = SQLiteCheckpointStore(path, ttl=TTL)
+    assert store.load("T_old")['user_token'] is None
+    store.start_test("T1", "Alice", "token_0123456789abcdef")
+    assert store.load("T1")['user_token'] == "token_0123456789abcdef"
+
+def test_complete(store):
+    store.start_test("T1", "Alice")
+    store.append_answer("T1", answer(1, True))
+    store.complete_test("T1")
+    assert store.load("T1")['completed']
+
+def test_complete_missing_test_is_noop(store):
+    store.complete_test("T_missing")
+    assert store.load("T_missing") is None
+
+def test_expired_checkpoint(store, monkeypatch):
+    store.start_test("T1", "Alice")
+    now = time.time()
+    monkeypatch.setattr(session_store.time, "time", lambda: now + TTL + 10)
+    assert store.load("T1") is None
+
+def test_purge_expired(store):
+    store.start_test("T1", "Alice")
+    assert store.purge_expired(now=time.time()) == 0
+    assert store.purge_expired(now=time.time() + TTL + 10) == 1
+    assert store.load("T1") is None
+    store.complete_test("T1")
+    assert store.load("T1") is None
+
+def test_unknown_test(store):
+    assert store.load("T_unknown") is None
+
+def test_rebuild_matches_rule(store):
+    results = [True, True, False, True, True, False, False]
+    store.start_test("T1", "Alice")
+    difficulty, first_two = INITIAL_DIFFICULTY, []
+    for num, is_correct in enumerate(results, 1):
+        store.append_answer("T1", answer(num, is_correct, difficulty))
+        if num <= 2:
+            first_two.append(is_correct)
+        difficulty = next_difficulty(num, difficulty, is_correct, first_two)
+
+    state = rebuild_test_state(store.load("T1")['answers'])
+
+    assert state['current_question_num'] == len(results) + 1
+    assert state['current_difficulty'] == difficulty
+    assert state['first_two_results'] == [True, True]
+    assert state['used_question_ids'] == {f"Q{num}" for num in range(1, len(results) + 1)}
+
+def test_rebuild_empty():
+    state = rebuild_test_state([])
+    assert state['current_question_num'] == 1
+    assert state['current_difficulty'] == INITIAL_DIFFICULTY
@@ -0,0 +1,74 @@
+"""用户历史成绩：按令牌隔离，缓存失效与并发查询"""
+
+import threading
+
+from user_history import HistoryCache, HistoryStore, new_user_token
+from voca_rules import compute_results
+
+def make_results(test_id, user_token, user_name="Alice", test_date="2026-01-02 03:04:05"):
+    answers = [{'question_id': "q1", 'difficulty': 3, 'is_correct': True}]
+    return {
+        'test_id': test_id,
+        'user_name': user_name,
+        'user_token': user_token,
+        'test_date': test_date,
+        **compute_results(answers, final_difficulty=3),
+    }
+
+def test_history_is_keyed_by_token_not_name(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    mine, theirs = new_user_token(), new_user_token()
+    store.record_result(make_results("T1", mine))
+    store.record_result(make_results("T2", theirs))
+
+    assert list(store.get_history(mine)['test_id']) == ["T1"]
+    assert list(store.get_history(theirs)['test_id']) == ["T2"]
+    assert store.get_history("Alice").empty
+
+def test_results_without_token_are_not_recorded(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    assert not store.record_result(make_results("T1", None))
+    assert not store.record_result(make_results("T2", "Alice"))
+
+def test_record_result_invalidates_cache(tmp_path):
+    cache = HistoryCache(HistoryStore(str(tmp_path / "history.db")))
+    token = new_user_token()
+    cache.record_result(make_results("T1", token, test_date="2026-01-01 00:00:00"))
+    assert len(cache.get_history(token)) == 1
+    assert len(cache.get_history(token)) == 1
+    assert cache.hits == 1
+
+    cache.record_result(make_results("T2", token, test_date="2026-01-02 00:00:00"))
+    assert list(cache.get_history(token)['test_id']) == ["T1", "T2"]
+
+def test_read_started_before_invalidate_is_not_cached(tmp_path):
+    class SlowStore(HistoryStore):
+        """第一次查询在读到数据后等待，期间保存新结果"""
+
+        def __init__(self, path):
+            super().__init__(path)
+            self.read_done = threading.Event()
+            self.resume = threading.Event()
+
+        def get_history(self, user_token, limit=50):
+            history = super().get_history(user_token, limit)
+            if not self.read_done.is_set():
+                self.read_done.set()
+                self.resume.wait(5)
+            return history
+
+    store = SlowStore(str(tmp_path / "history.db"))
+    cache = HistoryCache(store)
+    token = new_user_token()
+    cache.record_result(make_results("T1", token, test_date="2026-01-01 00:00:00"))
+
+    stale = []
+    reader = threading.Thread(target=lambda: stale.append(cache.get_history(token)))
+    reader.start()
+    store.read_done.wait(5)
+    cache.record_result(make_results("T2", token, test_date="2026-01-02 00:00:00"))
+    store.resume.set()
+    reader.join(5)
+
+    assert list(stale[0]['test_id']) == ["T1"]
+    assert list(cache.get_history(token)['test_id']) == ["T1", "T2"]
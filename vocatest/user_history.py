@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 用户历史成绩
+
+按用户令牌建立索引保存每次测试的词汇量、正确率和各等级掌握度，
+查询只读取该用户的记录（索引查找），耗时与全部历史的规模无关。
+用户令牌是随机生成的标识（页面保存在链接中，HTTP 接口由客户端保存），
+与显示的姓名无关：同名用户互不可见，只输入姓名也无法查看他人的成绩。
+没有令牌的结果（包括旧版结果 CSV 中的记录）不写入历史成绩。
+
+进程内 LRU 缓存最近查询的用户；保存该用户的新结果时立即失效，
+其他工作进程的缓存最多在 ttl 秒后刷新。
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+# ==================== 常量配置 ====================
+DEFAULT_DB_FILE = "vocabulary_test_history.db"          # 历史成绩数据库
+DEFAULT_HISTORY_LIMIT = 50      # 每个用户最多返回的历史记录数
+DEFAULT_CACHE_SIZE = 1024       # LRU 缓存的用户数
+DEFAULT_CACHE_TTL = 60          # 缓存有效期（秒）
+LEVELS = range(1, 6)
+HISTORY_COLUMNS = ['test_id', 'test_date', 'total_vocabulary', 'accuracy'] + [f'level{lv}_mastery' for lv in LEVELS]
+USER_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+def new_user_token():
+    """生成新的用户令牌"""
+    return uuid.uuid4().hex
+
+def is_valid_user_token(user_token):
+    """检查用户令牌格式（16-64 位字母、数字、下划线或连字符）"""
+    return isinstance(user_token, str) and bool(USER_TOKEN_PATTERN.match(user_token))
+
+# ==================== 核心类 - 历史成绩存储 ====================
+class HistoryStore:
+    """SQLite 历史成绩表，按 (用户令牌, 测试时间) 建立索引"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS test_history (
+                    user_token TEXT NOT NULL,
+                    test_date TEXT NOT NULL,
+                    test_id TEXT NOT NULL,
+                    total_vocabulary REAL NOT NULL,
+                    accuracy REAL NOT NULL,
+                    {", ".join(f"level{lv}_mastery REAL NOT NULL" for lv in LEVELS)},
+                    PRIMARY KEY (user_token, test_date, test_id)
+                ) WITHOUT ROWID;
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record_result(self, results):
+        """
+        保存一条 calculate_test_results() 结果（按 results['user_token'] 归档）
+        返回：是否已保存（没有有效令牌时不保存）
+        """
+        user_token = results.get('user_token')
+        if not is_valid_user_token(user_token):
+            return False
+
+        row = [
+            user_token,
+            results['test_id'],
+            results['test_date'],
+            float(results['total_vocabulary']),
+            float(results['accuracy']),
+        ] + [float(results['difficulty_stats'][lv]['accuracy']) for lv in LEVELS]
+        placeholders = ", ".join("?" * len(row))
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO test_history (user_token, {', '.join(HISTORY_COLUMNS)}) VALUES ({placeholders})",
+                row
+            )
+        return True
+
+    def get_history(self, user_token, limit=DEFAULT_HISTORY_LIMIT):
+        """
+        查询用户最近的测试记录
+        返回：按测试时间升序排列的 DataFrame
+        """
+        rows = self._connect().execute(f"""
+            SELECT {', '.join(HISTORY_COLUMNS)} FROM test_history
+            WHERE user_token = ? ORDER BY test_date DESC LIMIT ?
+        """, (user_token, limit)).fetchall()
+        return pd.DataFrame(rows[::-1], columns=HISTORY_COLUMNS)
+
+# ==================== 核心类 - LRU 缓存 ====================
+class HistoryCache:
+    """
+    历史成绩的进程内 LRU 缓存
+    通过 record_result() 保存结果会立即使该用户的缓存失效；
+    失效之前开始的查询结果不会再写入缓存
+    """
+
+    def __init__(self, store, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.store = store
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()       # 用户令牌 -> (查询开始时间, DataFrame)
+        self._invalidated = OrderedDict()   # 用户令牌 -> 最近一次失效时间（只保留 ttl 内的）
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_history(self, user_token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_token)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(user_token)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        history = self.store.get_history(user_token)
+        with self._lock:
+            # 查询期间该用户有新结果时，本次结果可能已过时，不写入缓存
+            if self._invalidated.get(user_token, float('-inf')) < now:
+                self._entries[user_token] = (now, history)
+                self._entries.move_to_end(user_token)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return history
+
+    def invalidate(self, user_token):
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(user_token, None)
+            self._invalidated[user_token] = now
+            self._invalidated.move_to_end(user_token)
+            # 早于 ttl 的失效记录不再需要：在那之前开始的查询写入的缓存已经过期
+            while self._invalidated and next(iter(self._invalidated.values())) < now - self.ttl:
+                self._invalidated.popitem(last=False)
+
+    def record_result(self, results):
+        """保存结果并使该用户的缓存失效"""
+        saved = self.store.record_result(results)
+        if saved:
+            self.invalidate(results['user_token'])
+        return saved
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+英语词汇量自适应测试系统 - 评分与难度规则
+
+不依赖 Streamlit，供页面程序、批量评分等模块共用同一套规则。
+"""
+
+# ==================== 常量配置 ====================
+# 难度等级配置
+DIFFICULTY_LEVELS = {
+    1: {
+        "name": "小学初中词汇",
+        "base_score": 1,
+        "increment": 1800,
+        "color": "#87CEEB",
+        "description": "基础日常词汇，适合初学者"
+    },
+    2: {
+        "name": "高中词汇",
+        "base_score": 2,
+        "increment": 1700,
+        "color": "#6495ED",
+        "description": "中等难度词汇，适合高中水平"
+    },
+    3: {
+        "name": "四六级词汇",
+        "base_score": 3,
+        "increment": 2500,
+        "color": "#4169E1",
+        "description": "大学英语考试核心词汇"
+    },
+    4: {
+        "name": "专四雅思托福",
+        "base_score": 4,
+        "increment": 4000,
+        "color": "#191970",
+        "description": "专业考试和留学常用词汇"
+    },
+    5: {
+        "name": "GRE专八词汇",
+        "base_score": 5,
+        "increment": 5000,
+        "color": "#000080",
+        "description": "高级学术和研究生水平词汇"
+    }
+}
+
+# 系统配置
+BASE_VOCABULARY = 500      # 基础词汇量
+MAX_QUESTIONS = 25         # 最大题目数
+INITIAL_DIFFICULTY = 3     # 起始难度
+MIN_DIFFICULTY = 1         # 最低难度
+MAX_DIFFICULTY = 5         # 最高难度
+
+# 学习建议阈值：词汇量低于阈值时给出对应建议
+SUGGESTION_THRESHOLDS = [
+    (2500, "建议从基础词汇开始系统学习"),
+    (5000, "建议巩固四六级词汇"),
+    (8000, "建议学习雅思托福词汇"),
+    (12000, "建议学习GRE专业词汇"),
+]
+TOP_SUGGESTION = "您的词汇量非常丰富，建议通过原版书籍和学术文献继续扩展"
+
+# 第3题根据前2题答对数确定的难度
+THIRD_QUESTION_DIFFICULTY = {2: 4, 1: 3, 0: 2}
+
+# ==================== 难度规则 ====================
+def next_difficulty(question_num, current_difficulty, is_correct, first_two_results):
+    """
+    根据答题结果计算下一题的难度
+    参数：当前题号、当前难度、本题是否答对、前两题对错列表
+    返回：下一个难度等级 (1-5)
+    """
+    # 规则1：前2题固定为初始难度
+    if question_num <= 2:
+        return INITIAL_DIFFICULTY
+
+    # 规则2：第3题根据前2题结果调整
+    if question_num == 3 and len(first_two_results) == 2:
+        return THIRD_QUESTION_DIFFICULTY[sum(first_two_results)]
+
+    # 规则3：第4题开始，答对升1级，答错降1级
+    if is_correct:
+        return min(current_difficulty + 1, MAX_DIFFICULTY)
+    else:
+        return max(current_difficulty - 1, MIN_DIFFICULTY)
+
+# ==================== 结果计算 ====================
+def get_suggestion(total_vocabulary):
+    """根据词汇量返回学习建议"""
+    for threshold, suggestion in SUGGESTION_THRESHOLDS:
+        if total_vocabulary < threshold:
+            return suggestion
+    return TOP_SUGGESTION
+
+def compute_results(user_answers, final_difficulty):
+    """
+    根据答题记录计算统计结果
+    参数：答题记录列表（每条至少包含 difficulty、is_correct）、最终难度
+    返回：包含统计、分数、词汇量、难度分析和学习建议的字典
+    """
+    # 基本统计
+    total_questions = len(user_answers)
+    correct_count = sum(1 for ans in user_answers if ans['is_correct'])
+    accuracy = (correct_count / total_questions * 100) if total_questions > 0 else 0
+
+    # 按难度统计
+    difficulty_stats = {}
+    for diff in range(1, 6):
+        diff_questions = [ans for ans in user_answers if ans['difficulty'] == diff]
+        diff_total = len(diff_questions)
+        diff_correct = sum(1 for ans in diff_questions if ans['is_correct'])
+
+        if diff_total > 0:
+            diff_accuracy = diff_correct / diff_total * 100
+        else:
+            diff_accuracy = 0
+
+        difficulty_stats[diff] = {
+            'total': diff_total,
+            'correct': diff_correct,
+            'accuracy': diff_accuracy,
+            'mastery': diff_accuracy / 100  # 掌握度 (0-1)
+        }
+
+    # 计算词汇量
+    vocabulary_increment = 0
+    for diff in range(1, 6):
+        mastery = difficulty_stats[diff]['mastery']
+        increment = DIFFICULTY_LEVELS[diff]["increment"]
+        vocabulary_increment += increment * mastery
+
+    total_vocabulary = BASE_VOCABULARY + vocabulary_increment
+
+    # 计算分数
+    total_score = 0
+    max_score = 0
+    for ans in user_answers:
+        diff = ans['difficulty']
+        weight = DIFFICULTY_LEVELS[diff]["base_score"]
+        max_score += weight
+        if ans['is_correct']:
+            total_score += weight
+
+    score_percentage = (total_score / max_score * 100) if max_score > 0 else 0
+
+    return {
+        # 基本统计
+        'total_questions': total_questions,
+        'correct_count': correct_count,
+        'accuracy': accuracy,
+
+        # 分数
+        'total_score': total_score,
+        'max_score': max_score,
+        'score_percentage': score_percentage,
+
+        # 词汇量
+        'base_vocabulary': BASE_VOCABULARY,
+        'vocabulary_increment': vocabulary_increment,
+        'total_vocabulary': total_vocabulary,
+
+        # 难度分析
+        'difficulty_stats': difficulty_stats,
+        'final_difficulty': final_difficulty,
+        'final_difficulty_name': DIFFICULTY_LEVELS[final_difficulty]["name"],
+
+        # 学习建议
+        'suggestion': get_suggestion(total_vocabulary),
+    }
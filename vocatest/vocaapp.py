@@ -22,65 +22,50 @@ import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 import hashlib
-import time
+import hmac
 import json
+import atexit
+import uuid
 from collections import defaultdict
 import matplotlib
 matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 matplotlib.rcParams['axes.unicode_minus'] = False
 
 # ==================== 第三部分：常量配置 ====================
-# 难度等级配置
-DIFFICULTY_LEVELS = {
-    1: {
-        "name": "小学初中词汇", 
-        "base_score": 1, 
-        "increment": 1800, 
-        "color": "#87CEEB",
-        "description": "基础日常词汇，适合初学者"
-    },
-    2: {
-        "name": "高中词汇", 
-        "base_score": 2, 
-        "increment": 1700, 
-        "color": "#6495ED",
-        "description": "中等难度词汇，适合高中水平"
-    },
-    3: {
-        "name": "四六级词汇", 
-        "base_score": 3, 
-        "increment": 2500, 
-        "color": "#4169E1",
-        "description": "大学英语考试核心词汇"
-    },
-    4: {
-        "name": "专四雅思托福", 
-        "base_score": 4, 
-        "increment": 4000, 
-        "color": "#191970",
-        "description": "专业考试和留学常用词汇"
-    },
-    5: {
-        "name": "GRE专八词汇", 
-        "base_score": 5, 
-        "increment": 5000, 
-        "color": "#000080",
-        "description": "高级学术和研究生水平词汇"
-    }
-}
+# 难度等级、词汇量和难度规则配置见 voca_rules.py（与批量评分等模块共用）
+from voca_rules import (
+    DIFFICULTY_LEVELS,
+    BASE_VOCABULARY,
+    MAX_QUESTIONS,
+    INITIAL_DIFFICULTY,
+    compute_results,
+)
+from routing import ItemQueues, INITIAL_STATE, next_state, state_level
+from results_sink import create_results_sink_from_env
+from result_recorder import ResultRecorder
+from session_store import SQLiteCheckpointStore, rebuild_test_state
+from admission import AdmissionController, DEFAULT_MAX_ACTIVE
+from analytics import AnalyticsStore
+from question_bank import build_question_bank
+from user_history import HistoryStore, HistoryCache, new_user_token, is_valid_user_token
 
 # 系统配置
-BASE_VOCABULARY = 500      # 基础词汇量
-MAX_QUESTIONS = 25         # 最大题目数
-INITIAL_DIFFICULTY = 3     # 起始难度
 QUESTION_BANK_FILE = "vocatest/data.xlsx"  # 题库文件名
 RESULTS_FILE = "vocabulary_test_results.csv"  # 结果保存文件
+CHECKPOINT_DB_FILE = "vocabulary_test_checkpoints.db"  # 测试进度检查点（多进程共享）
+MAX_ACTIVE_TESTS = int(os.environ.get("VOCATEST_MAX_ACTIVE_TESTS", DEFAULT_MAX_ACTIVE))  # 每进程同时进行的测试上限
+QUEUE_REFRESH_SECONDS = 2  # 排队页面自动刷新间隔（秒）
+ANALYTICS_DB_FILE = "vocabulary_test_analytics.db"  # 统计汇总表
+HISTORY_DB_FILE = "vocabulary_test_history.db"  # 按用户令牌索引的历史成绩
+USER_TOKEN_PARAM = "uid"  # 链接中保存用户令牌的参数名
+ADMIN_PASSWORD = os.environ.get("VOCATEST_ADMIN_PASSWORD", "")  # 统计面板密码（未设置时不开放统计面板）
 
 # ==================== 第四部分：核心函数 - 数据加载 ====================
 @st.cache_data
-def load_question_bank():
+def load_question_bank(bank_version=None):
     """
     加载词汇题库
+    bank_version 仅作为缓存键，题库文件修改后重新加载
     返回：题目列表，如果失败返回空列表
     """
     import os
@@ -103,77 +88,106 @@ def load_question_bank():
     
     st.write(f"✅ 找到文件: {file_path}")
 
-        
-    if not os.path.exists(QUESTION_BANK_FILE):
-        return []
     
     try:
-        all_questions = []
-        sheet_names = ["小学初中", "高中", "四六级", "专四雅思托福", "GRE专八"]
-        
-        for difficulty_level, sheet_name in enumerate(sheet_names, 1):
-            try:
-                # 读取Excel表格
-                df = pd.read_excel(QUESTION_BANK_FILE, sheet_name=sheet_name)
-                
-                # 检查必要的列
-                required_columns = ['question', 'correct_option', 'option_a', 'option_b']
-                missing_columns = [col for col in required_columns if col not in df.columns]
-                if missing_columns:
-                    continue
-                
-                # 处理每一行数据
-                for idx, row in df.iterrows():
-                    try:
-                        # 确保题目不为空
-                        question_text = str(row['question']).strip()
-                        if not question_text:
-                            continue
-                        
-                        # 转换正确答案
-                        correct_option = str(row['correct_option']).strip().upper()
-                        option_map = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
-                        correct_index = option_map.get(correct_option, 0)
-                        
-                        # 收集选项
-                        options = []
-                        option_keys = ['option_a', 'option_b', 'option_c', 'option_d']
-                        
-                        for opt_key in option_keys:
-                            if opt_key in row and not pd.isna(row[opt_key]):
-                                options.append(str(row[opt_key]).strip())
-                            else:
-                                options.append("")
-                        
-                        # 确保至少有2个有效选项
-                        valid_options = [opt for opt in options if opt.strip()]
-                        if len(valid_options) < 2:
-                            continue
-                        
-                        # 创建题目对象
-                        question = {
-                            'id': f"L{difficulty_level}_{idx + 1}",
-                            'question': question_text,
-                            'options': options,
-                            'correct': correct_index,
-                            'difficulty': difficulty_level,
-                            'sheet_name': sheet_name
-                        }
-                        
-                        all_questions.append(question)
-                        
-                    except Exception as row_error:
-                        continue
-                
-            except Exception as sheet_error:
-                continue
-        
-        return all_questions
-            
+        # 题目ID由内容哈希生成；未修改的工作表直接复用上次的解析结果
+        bank = build_question_bank(file_path)
     except Exception as e:
         return []
+    
+    if bank['duplicates']:
+        st.write(f"⚠️ 发现 {len(bank['duplicates'])} 道重复题目，已只保留第一次出现的:")
+        st.write([f"{dup['question']} ({', '.join(dup['locations'])})" for dup in bank['duplicates']])
+    
+    return bank['questions']
+
+def question_bank_version():
+    """题库文件版本（修改时间和大小），题库文件变化后自动重新加载"""
+    try:
+        stat = os.stat(QUESTION_BANK_FILE if os.path.exists("vocatest") else "data.xlsx")
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_resource
+def get_results_sink():
+    """
+    获取进程内共享的外部结果写入器
+    返回：结果写入器，未配置时返回 None
+    """
+    sink = create_results_sink_from_env()
+    if sink is not None:
+        atexit.register(sink.close)
+    return sink
+
+@st.cache_resource
+def get_checkpoint_store():
+    """获取进程内共享的测试进度检查点存储"""
+    return SQLiteCheckpointStore(CHECKPOINT_DB_FILE)
+
+@st.cache_resource
+def get_admission_controller():
+    """获取进程内共享的准入控制器"""
+    return AdmissionController(max_active=MAX_ACTIVE_TESTS)
+
+@st.cache_resource
+def get_analytics_store():
+    """获取进程内共享的统计汇总表"""
+    return AnalyticsStore(ANALYTICS_DB_FILE)
+
+@st.cache_resource
+def get_history_cache():
+    """获取进程内共享的历史成绩 LRU 缓存"""
+    return HistoryCache(HistoryStore(HISTORY_DB_FILE))
+
+@st.cache_resource
+def get_result_recorder():
+    """获取进程内共享的结果保存器（与 HTTP 接口相同的保存步骤）"""
+    return ResultRecorder(
+        RESULTS_FILE,
+        history=get_history_cache(),
+        analytics=get_analytics_store(),
+        sink=get_results_sink()
+    )
 
 # ==================== 第五部分：核心函数 - 会话状态管理 ====================
+# st.query_params 需要 Streamlit 1.30+，更早的版本使用 experimental 接口
+def get_link_param(name):
+    """读取链接参数"""
+    if hasattr(st, "query_params"):
+        return st.query_params.get(name)
+    return st.experimental_get_query_params().get(name, [None])[0]
+
+def set_link_param(name, value):
+    """写入链接参数（为 None 时删除），其他参数保持不变"""
+    if hasattr(st, "query_params"):
+        if value is None:
+            st.query_params.pop(name, None)
+        else:
+            st.query_params[name] = value
+    else:
+        params = st.experimental_get_query_params()
+        if value is None:
+            params.pop(name, None)
+        else:
+            params[name] = [value]
+        st.experimental_set_query_params(**params)
+
+def get_user_token(create=False):
+    """
+    获取本用户的历史成绩令牌（随机生成，保存在链接中，与姓名无关）
+    收藏带令牌的链接即可再次查看历史成绩；create 为 False 时没有令牌返回 None
+    """
+    if not st.session_state.user_token:
+        user_token = get_link_param(USER_TOKEN_PARAM)
+        if not is_valid_user_token(user_token):
+            if not create:
+                return None
+            user_token = new_user_token()
+        st.session_state.user_token = user_token
+    set_link_param(USER_TOKEN_PARAM, st.session_state.user_token)
+    return st.session_state.user_token
+
 def init_session_state():
     """初始化所有会话状态变量"""
     # 用户信息
@@ -181,10 +195,12 @@ def init_session_state():
         st.session_state.user_name = ""
     if 'test_id' not in st.session_state:
         st.session_state.test_id = ""
+    if 'user_token' not in st.session_state:
+        st.session_state.user_token = ""  # 历史成绩令牌（见 get_user_token）
     
     # 测试状态
     if 'test_phase' not in st.session_state:
-        st.session_state.test_phase = "welcome"  # welcome, testing, results
+        st.session_state.test_phase = "welcome"  # welcome, queued, testing, results, admin
     
     # 题目管理
     if 'current_question_num' not in st.session_state:
@@ -197,6 +213,10 @@ def init_session_state():
         st.session_state.user_answers = []
     if 'first_two_results' not in st.session_state:
         st.session_state.first_two_results = []  # 存储前两题对错
+    if 'route_state' not in st.session_state:
+        st.session_state.route_state = INITIAL_STATE  # 路由状态（难度和前两题答对数）
+    if 'item_queues' not in st.session_state:
+        st.session_state.item_queues = None  # 本次测试预先打乱的分级题目队列
     
     # 当前题目
     if 'current_question_data' not in st.session_state:
@@ -211,6 +231,10 @@ def init_session_state():
     # 结果数据
     if 'test_results' not in st.session_state:
         st.session_state.test_results = None
+    if 'results_saved' not in st.session_state:
+        st.session_state.results_saved = False
+    if 'checkpoint_started' not in st.session_state:
+        st.session_state.checkpoint_started = False  # 是否已写入初始检查点
 
 def reset_test_state():
     """重置测试状态，准备开始新测试"""
@@ -220,11 +244,94 @@ def reset_test_state():
     st.session_state.used_question_ids = set()
     st.session_state.user_answers = []
     st.session_state.first_two_results = []
+    st.session_state.route_state = INITIAL_STATE
+    st.session_state.item_queues = None
     st.session_state.current_question_data = None
     st.session_state.user_selection = None
     st.session_state.show_feedback = False
     st.session_state.feedback_message = ""
     st.session_state.test_results = None
+    st.session_state.results_saved = False
+    st.session_state.checkpoint_started = False
+
+def admit_test():
+    """
+    申请测试名额，名额已满时进入排队
+    放行后才写入初始检查点并把测试ID放入链接，排队中的测试无法通过刷新页面跳过排队
+    返回：(是否已放行, 排队位置)
+    """
+    admitted, position = get_admission_controller().request(st.session_state.test_id)
+    if not admitted:
+        st.session_state.test_phase = "queued"
+        return False, position
+    
+    st.session_state.test_phase = "testing"
+    if not st.session_state.checkpoint_started:
+        # 写入检查点，并把测试ID放入链接，任意工作进程都能据此恢复
+        try:
+            get_checkpoint_store().start_test(
+                st.session_state.test_id, st.session_state.user_name, get_user_token(create=True)
+            )
+            set_link_param("test_id", st.session_state.test_id)
+        except Exception as e:
+            pass
+        st.session_state.checkpoint_started = True
+    return True, 0
+
+def start_new_test(user_name):
+    """
+    生成新的测试ID，重置测试状态并申请测试名额
+    返回：(是否已放行, 排队位置)
+    """
+    st.session_state.user_name = user_name
+    
+    # 生成唯一的测试ID（加入随机数，避免多个进程同一秒内生成相同ID）
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    unique_hash = hashlib.md5(f"{user_name}{timestamp}{uuid.uuid4().hex}".encode()).hexdigest()[:8]
+    st.session_state.test_id = f"VT_{timestamp}_{unique_hash}"
+    
+    # 重置测试状态
+    reset_test_state()
+    
+    # 申请测试名额（放行后写入初始检查点）
+    return admit_test()
+
+def resume_test_from_checkpoint():
+    """
+    根据链接中的 test_id 恢复测试进度（会话丢失或被分配到其他工作进程时）
+    返回：是否成功恢复
+    """
+    if st.session_state.test_id:
+        return False
+    
+    test_id = get_link_param("test_id")
+    if not test_id:
+        return False
+    
+    try:
+        checkpoint = get_checkpoint_store().load(test_id)
+    except Exception as e:
+        checkpoint = None
+    
+    if checkpoint is None or checkpoint['completed']:
+        set_link_param("test_id", None)
+        return False
+    
+    reset_test_state()
+    st.session_state.user_name = checkpoint['user_name']
+    st.session_state.test_id = test_id
+    # 链接中没有令牌时沿用开始测试时的令牌，结果仍归档到同一用户
+    if not get_user_token() and checkpoint.get('user_token'):
+        st.session_state.user_token = checkpoint['user_token']
+        set_link_param(USER_TOKEN_PARAM, checkpoint['user_token'])
+    for key, value in rebuild_test_state(checkpoint['answers']).items():
+        st.session_state[key] = value
+    st.session_state.checkpoint_started = True
+    
+    # 恢复的测试同样受名额限制，名额已满时排队
+    admit_test()
+    
+    return True
 
 # ==================== 第六部分：核心函数 - 自适应逻辑 ====================
 def select_next_question(question_bank, target_difficulty):
@@ -232,25 +339,14 @@ def select_next_question(question_bank, target_difficulty):
     根据目标难度选择下一道题目
     返回：题目数据 或 None（如果没有题目）
     """
-    # 筛选符合条件的题目
-    available_questions = [
-        q for q in question_bank 
-        if q['difficulty'] == target_difficulty 
-        and q['id'] not in st.session_state.used_question_ids
-    ]
-    
-    if not available_questions:
-        # 如果没有目标难度的题目，选择其他未使用的题目
-        available_questions = [
-            q for q in question_bank 
-            if q['id'] not in st.session_state.used_question_ids
-        ]
-    
-    if not available_questions:
-        return None
+    # 首次选题时为本次测试打乱各难度题目（恢复的测试排除已用题目）
+    if st.session_state.item_queues is None:
+        st.session_state.item_queues = ItemQueues(question_bank, st.session_state.used_question_ids)
     
-    # 随机选择一道题目
-    selected_question = random.choice(available_questions)
+    # 从目标难度队列中取题，该难度没有题目时从其他难度中选择
+    selected_question = st.session_state.item_queues.pop(target_difficulty)
+    if selected_question is None:
+        return None
     
     # 标记为已使用
     st.session_state.used_question_ids.add(selected_question['id'])
@@ -259,32 +355,15 @@ def select_next_question(question_bank, target_difficulty):
 
 def calculate_next_difficulty(is_correct):
     """
-    根据答题结果计算下一题的难度
+    根据答题结果查路由表得到下一题的难度（同时更新路由状态）
     返回：下一个难度等级 (1-5)
     """
-    current_q_num = st.session_state.current_question_num
-    current_diff = st.session_state.current_difficulty
-    
-    # 规则1：前2题固定为初始难度
-    if current_q_num <= 2:
-        return INITIAL_DIFFICULTY
-    
-    # 规则2：第3题根据前2题结果调整
-    elif current_q_num == 3:
-        if len(st.session_state.first_two_results) == 2:
-            correct_count = sum(st.session_state.first_two_results)
-            if correct_count == 2:   # 全对
-                return 4
-            elif correct_count == 1: # 对1错1
-                return 3
-            else:                    # 全错
-                return 2
-    
-    # 规则3：第4题开始，答对升1级，答错降1级
-    if is_correct:
-        return min(current_diff + 1, 5)  # 最高不超过5级
-    else:
-        return max(current_diff - 1, 1)  # 最低不低于1级
+    st.session_state.route_state = next_state(
+        st.session_state.route_state,
+        st.session_state.current_question_num,
+        is_correct
+    )
+    return state_level(st.session_state.route_state)
 
 def process_user_answer(selected_option, question_data):
     """
@@ -311,6 +390,12 @@ def process_user_answer(selected_option, question_data):
     
     st.session_state.user_answers.append(answer_record)
     
+    # 写入本题的增量检查点
+    try:
+        get_checkpoint_store().append_answer(st.session_state.test_id, answer_record)
+    except Exception as e:
+        pass
+    
     # 记录前两题结果
     if st.session_state.current_question_num <= 2:
         st.session_state.first_two_results.append(is_correct)
@@ -338,94 +423,15 @@ def calculate_test_results():
     """
     user_answers = st.session_state.user_answers
     
-    # 基本统计
-    total_questions = len(user_answers)
-    correct_count = sum(1 for ans in user_answers if ans['is_correct'])
-    accuracy = (correct_count / total_questions * 100) if total_questions > 0 else 0
-    
-    # 按难度统计
-    difficulty_stats = {}
-    for diff in range(1, 6):
-        diff_questions = [ans for ans in user_answers if ans['difficulty'] == diff]
-        diff_total = len(diff_questions)
-        diff_correct = sum(1 for ans in diff_questions if ans['is_correct'])
-        
-        if diff_total > 0:
-            diff_accuracy = diff_correct / diff_total * 100
-        else:
-            diff_accuracy = 0
-        
-        difficulty_stats[diff] = {
-            'total': diff_total,
-            'correct': diff_correct,
-            'accuracy': diff_accuracy,
-            'mastery': diff_accuracy / 100  # 掌握度 (0-1)
-        }
-    
-    # 计算词汇量
-    vocabulary_increment = 0
-    for diff in range(1, 6):
-        mastery = difficulty_stats[diff]['mastery']
-        increment = DIFFICULTY_LEVELS[diff]["increment"]
-        vocabulary_increment += increment * mastery
-    
-    total_vocabulary = BASE_VOCABULARY + vocabulary_increment
-    
-    # 计算分数
-    total_score = 0
-    max_score = 0
-    for ans in user_answers:
-        diff = ans['difficulty']
-        weight = DIFFICULTY_LEVELS[diff]["base_score"]
-        max_score += weight
-        if ans['is_correct']:
-            total_score += weight
-    
-    score_percentage = (total_score / max_score * 100) if max_score > 0 else 0
-    
-    # 最终难度评估
-    final_difficulty = st.session_state.current_difficulty
-    difficulty_name = DIFFICULTY_LEVELS[final_difficulty]["name"]
-    
-    # 学习建议
-    if total_vocabulary < 2500:
-        suggestion = "建议从基础词汇开始系统学习"
-    elif total_vocabulary < 5000:
-        suggestion = "建议巩固四六级词汇"
-    elif total_vocabulary < 8000:
-        suggestion = "建议学习雅思托福词汇"
-    elif total_vocabulary < 12000:
-        suggestion = "建议学习GRE专业词汇"
-    else:
-        suggestion = "您的词汇量非常丰富，建议通过原版书籍和学术文献继续扩展"
+    # 统计、分数、词汇量和学习建议与批量评分共用同一套规则
+    stats = compute_results(user_answers, st.session_state.current_difficulty)
     
     results = {
         'user_name': st.session_state.user_name,
+        'user_token': get_user_token(create=True),
         'test_id': st.session_state.test_id,
         'test_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        
-        # 基本统计
-        'total_questions': total_questions,
-        'correct_count': correct_count,
-        'accuracy': accuracy,
-        
-        # 分数
-        'total_score': total_score,
-        'max_score': max_score,
-        'score_percentage': score_percentage,
-        
-        # 词汇量
-        'base_vocabulary': BASE_VOCABULARY,
-        'vocabulary_increment': vocabulary_increment,
-        'total_vocabulary': total_vocabulary,
-        
-        # 难度分析
-        'difficulty_stats': difficulty_stats,
-        'final_difficulty': final_difficulty,
-        'final_difficulty_name': difficulty_name,
-        
-        # 学习建议
-        'suggestion': suggestion,
+        **stats,
         
         # 详细记录
         'answers': user_answers
@@ -434,41 +440,9 @@ def calculate_test_results():
     return results
 
 def save_results_to_file(results):
-    """保存测试结果到CSV文件"""
+    """保存测试结果（结果文件、历史成绩、统计汇总表和外部结果表）"""
     try:
-        # 准备要保存的数据
-        save_data = {
-            'test_id': results['test_id'],
-            'user_name': results['user_name'],
-            'test_date': results['test_date'],
-            'total_questions': results['total_questions'],
-            'correct_count': results['correct_count'],
-            'accuracy': f"{results['accuracy']:.1f}%",
-            'total_score': f"{results['total_score']}/{results['max_score']}",
-            'total_vocabulary': int(results['total_vocabulary']),
-            'final_difficulty': f"Lv.{results['final_difficulty']}",
-            'suggestion': results['suggestion']
-        }
-        
-        # 添加各难度掌握度
-        for diff in range(1, 6):
-            stats = results['difficulty_stats'][diff]
-            save_data[f'level{diff}_mastery'] = f"{stats['accuracy']:.1f}%"
-        
-        # 保存到DataFrame
-        df = pd.DataFrame([save_data])
-        
-        # 追加到CSV文件
-        if os.path.exists(RESULTS_FILE):
-            existing_df = pd.read_csv(RESULTS_FILE)
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-        else:
-            combined_df = df
-        
-        # 保存文件
-        combined_df.to_csv(RESULTS_FILE, index=False, encoding='utf-8-sig')
-        
-        return True
+        return get_result_recorder().record(results)
     except Exception as e:
         return False
 
@@ -521,27 +495,101 @@ def show_welcome_page():
                 type="primary",
                 use_container_width=True
             )
+        with col3:
+            history_button = st.form_submit_button(
+                "查看历史成绩",
+                use_container_width=True
+            )
+    
+    # 查看历史成绩（只能查看本链接令牌下的成绩，不按姓名查询）
+    if history_button:
+        user_token = get_user_token()
+        if user_token:
+            show_history_panel(user_name.strip(), user_token)
+        else:
+            st.info("当前链接没有历史成绩。完成测试后收藏结果页面的链接，即可再次查看历史成绩")
     
     # 处理开始测试
     if start_button:
         if user_name and 2 <= len(user_name.strip()) <= 20:
-            st.session_state.user_name = user_name.strip()
+            # 生成测试ID并重置测试状态
+            admitted, position = start_new_test(user_name.strip())
             
-            # 生成唯一的测试ID
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_hash = hashlib.md5(f"{user_name}{timestamp}".encode()).hexdigest()[:8]
-            st.session_state.test_id = f"VT_{timestamp}_{unique_hash}"
-            
-            # 重置测试状态
-            reset_test_state()
-            
-            # 显示成功消息并刷新
-            st.success(f"测试即将开始")
-            time.sleep(1)
+            # 提示消息在刷新后仍会显示，无需阻塞等待；排队时由排队页面说明
+            if admitted:
+                st.toast("测试即将开始")
             st.rerun()
         else:
             st.error("请输入2-20个字符的姓名或昵称")
 
+def show_history_panel(user_name, user_token):
+    """显示用户令牌下的历史成绩（词汇量、正确率和各等级掌握度随时间的变化）"""
+    st.markdown("---")
+    st.markdown(f"### {user_name} 的历史成绩" if user_name else "### 我的历史成绩")
+    
+    try:
+        history = get_history_cache().get_history(user_token)
+    except Exception as e:
+        st.info("暂时无法读取历史成绩")
+        return
+    
+    if history.empty:
+        st.info("暂无历史成绩")
+        return
+    
+    history = history.copy()
+    history['test_date'] = pd.to_datetime(history['test_date'], errors='coerce')
+    history = history.set_index('test_date')
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**词汇量变化**")
+        st.line_chart(history[['total_vocabulary']])
+    with col2:
+        st.markdown("**各等级掌握度变化 (%)**")
+        mastery = history[[f'level{i}_mastery' for i in range(1, 6)]]
+        mastery.columns = [f"Lv.{i}" for i in range(1, 6)]
+        st.line_chart(mastery)
+    
+    records = pd.DataFrame({
+        "测试时间": history.index.strftime('%Y-%m-%d %H:%M'),
+        "词汇量": history['total_vocabulary'].astype(int).map(lambda v: f"{v:,}"),
+        "正确率": history['accuracy'].map(lambda v: f"{v:.1f}%"),
+        **{f"Lv.{i}": history[f'level{i}_mastery'].map(lambda v: f"{v:.1f}%") for i in range(1, 6)}
+    })
+    st.dataframe(records.iloc[::-1], use_container_width=True, hide_index=True)
+
+def _auto_refresh(func):
+    """Streamlit 支持时定时局部刷新（由服务器定时触发，不占用脚本线程等待）"""
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        return func
+    return fragment(run_every=QUEUE_REFRESH_SECONDS)(func)
+
+@_auto_refresh
+def show_queue_status():
+    """显示排队位置，轮到时自动开始测试"""
+    admitted, position = admit_test()
+    if admitted:
+        st.rerun()
+        return
+    
+    metrics = get_admission_controller().metrics()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("您的排队位置", position)
+    with col2:
+        st.metric("正在测试人数", f"{metrics['active']}/{metrics['max_active']}")
+    
+    if st.button("刷新排队状态", use_container_width=True):
+        pass
+
+def show_queue_page():
+    """显示排队页面"""
+    st.markdown("### 排队等候中")
+    st.info("当前参加测试的人数较多，轮到您时测试将自动开始，请不要关闭页面")
+    show_queue_status()
+
 def show_testing_page(question_bank):
     """显示测试页面"""
     current_q = st.session_state.current_question_num
@@ -552,6 +600,11 @@ def show_testing_page(question_bank):
         st.rerun()
         return
     
+    # 记录活动；长时间无操作已释放名额的测试需要重新申请，名额已满时排队
+    if not get_admission_controller().touch(st.session_state.test_id) and not admit_test()[0]:
+        st.rerun()
+        return
+    
     # 显示进度 - 修复进度条越界问题
     progress = min(current_q / MAX_QUESTIONS, 1.0)  # 确保不超过1.0
     
@@ -567,11 +620,8 @@ def show_testing_page(question_bank):
     
     # 直接显示题目，不显示反馈
     if st.session_state.current_question_data is None:
-        # 确定目标难度
-        if current_q <= 2:
-            target_difficulty = INITIAL_DIFFICULTY
-        else:
-            target_difficulty = st.session_state.current_difficulty
+        # 目标难度由路由状态直接给出（前2题为初始难度）
+        target_difficulty = state_level(st.session_state.route_state)
         
         # 选择题目
         question_data = select_next_question(question_bank, target_difficulty)
@@ -641,8 +691,17 @@ def show_results_page():
     
     results = st.session_state.test_results
     
-    # 保存结果到文件
-    save_results_to_file(results)
+    # 保存结果到文件（每次测试只保存一次，页面刷新不会重复写入）
+    if not st.session_state.results_saved:
+        # 历史成绩和统计已写入，结果文件写入失败时也不重复保存
+        save_results_to_file(results)
+        st.session_state.results_saved = True
+        try:
+            get_checkpoint_store().complete_test(results['test_id'])
+        except Exception as e:
+            pass
+        set_link_param("test_id", None)
+        get_admission_controller().release(results['test_id'])
     
     # 页面标题
     st.markdown('测试完成')
@@ -731,6 +790,10 @@ def show_results_page():
     
     with st.container():
         st.info(results['suggestion'])
+    
+    # 历史成绩（包括本次）
+    show_history_panel(results['user_name'], results['user_token'])
+    st.caption("收藏本页链接即可再次查看历史成绩，请勿分享给他人")
         
 
     
@@ -740,7 +803,7 @@ def show_results_page():
     
     with col1:
         if st.button("重新测试", use_container_width=True):
-            reset_test_state()
+            start_new_test(st.session_state.user_name)
             st.rerun()
     
     with col2:
@@ -791,6 +854,103 @@ def show_results_page():
             st.session_state.user_name = ""
             st.rerun()
 
+def show_admin_page(question_bank):
+    """显示统计面板（只读取增量汇总表，与历史结果数量无关）"""
+    # 未设置管理密码时不开放
+    if not ADMIN_PASSWORD:
+        st.session_state.test_phase = "welcome"
+        st.rerun()
+        return
+    
+    st.markdown("## 统计面板")
+    
+    password = st.text_input("请输入管理密码", type="password")
+    if not hmac.compare_digest(password.encode('utf-8'), ADMIN_PASSWORD.encode('utf-8')):
+        if password:
+            st.error("密码错误")
+        if st.button("返回首页"):
+            st.session_state.test_phase = "welcome"
+            st.rerun()
+        return
+    
+    store = get_analytics_store()
+    totals = store.totals()
+    daily = store.daily_summary(days=30)
+    
+    # 关键指标
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("累计测试数", f"{totals['tests']:,}")
+    with col2:
+        st.metric("平均词汇量", f"{int(totals['avg_vocabulary']):,}")
+    with col3:
+        today = datetime.now().strftime('%Y-%m-%d')
+        today_tests = daily.loc[daily['day'] == today, 'tests'].sum()
+        st.metric("今日测试数", f"{int(today_tests):,}")
+    
+    # 每日趋势
+    st.markdown("---")
+    st.markdown("### 近30天每日平均词汇量")
+    if daily.empty:
+        st.info("暂无数据")
+    else:
+        st.line_chart(daily.set_index('day')[['avg_vocabulary']])
+        st.dataframe(daily, use_container_width=True, hide_index=True)
+    
+    # 难度分布与掌握度
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 本周最终难度分布")
+        levels = store.level_distribution(days=7)
+        if not levels.empty:
+            levels['level'] = levels['level'].map(lambda lv: f"Lv.{lv}")
+            st.bar_chart(levels.set_index('level')[['tests']])
+    with col2:
+        st.markdown("### 各难度等级平均掌握度 (%)")
+        mastery = store.level_mastery()
+        if not mastery.empty:
+            mastery['level'] = mastery['level'].map(lambda lv: f"Lv.{lv}")
+            st.bar_chart(mastery.set_index('level')[['avg_mastery']])
+            st.caption("只统计作答过该等级的测试")
+            approximate = int(mastery['approximate_tests'].sum())
+            if approximate:
+                st.caption(f"其中 {approximate:,} 条来自历史结果回填，按掌握度大于 0 估算作答等级，为近似值")
+    
+    # 词汇量分布
+    st.markdown("---")
+    st.markdown("### 词汇量分布")
+    histogram = store.vocabulary_histogram()
+    if not histogram.empty:
+        histogram['bucket'] = histogram['bucket'].map(lambda b: f"{b:,}+")
+        st.bar_chart(histogram.set_index('bucket')[['tests']])
+    
+    # 题目正确率
+    st.markdown("---")
+    st.markdown("### 正确率最低的题目")
+    question_stats = store.question_stats(limit=20)
+    if question_stats.empty:
+        st.info("暂无数据")
+    else:
+        # 题目ID为内容哈希，显示题库中对应的题干和难度
+        questions = {q['id']: q for q in question_bank}
+        st.dataframe(pd.DataFrame({
+            "题目": question_stats['question_id'].map(
+                lambda qid: questions[qid]['question'] if qid in questions else f"{qid}（已不在题库中）"
+            ),
+            "难度": question_stats['question_id'].map(
+                lambda qid: f"Lv.{questions[qid]['difficulty']}" if qid in questions else "-"
+            ),
+            "作答次数": question_stats['attempts'],
+            "答对次数": question_stats['correct'],
+            "正确率": question_stats['correct_rate'].map(lambda v: f"{v:.1f}%"),
+        }), use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    if st.button("返回首页", use_container_width=True):
+        st.session_state.test_phase = "welcome"
+        st.rerun()
+
 def show_sidebar():
     """显示侧边栏"""
     with st.sidebar:
@@ -818,12 +978,21 @@ def show_sidebar():
         st.markdown(f"**测试题数:** {MAX_QUESTIONS}")
         st.markdown(f"**基础词汇:** {BASE_VOCABULARY:,}")
         
+        metrics = get_admission_controller().metrics()
+        st.markdown(f"**进行中测试:** {metrics['active']} / {metrics['max_active']}")
+        st.markdown(f"**排队人数:** {metrics['queued']}")
+        
         # 快速操作
         st.markdown("---")
         st.markdown("### 快速操作")
         
         if st.button("刷新页面", use_container_width=True):
             st.rerun()
+        
+        if ADMIN_PASSWORD and st.session_state.test_phase in ("welcome", "results"):
+            if st.button("统计面板", use_container_width=True):
+                st.session_state.test_phase = "admin"
+                st.rerun()
 
 # ==================== 第九部分：主函数 ====================
 def main():
@@ -831,8 +1000,11 @@ def main():
     # 初始化会话状态
     init_session_state()
     
+    # 恢复其他进程中未完成的测试
+    resume_test_from_checkpoint()
+    
     # 加载题库
-    question_bank = load_question_bank()
+    question_bank = load_question_bank(question_bank_version())
     if not question_bank:
         st.error("❌ 系统无法加载题库，请检查文件后刷新页面")
         st.info(f"请确保 '{QUESTION_BANK_FILE}' 文件与程序在同一目录，且格式正确")
@@ -847,11 +1019,17 @@ def main():
     if st.session_state.test_phase == "welcome":
         show_welcome_page()
     
+    elif st.session_state.test_phase == "queued":
+        show_queue_page()
+    
     elif st.session_state.test_phase == "testing":
         show_testing_page(question_bank)
     
     elif st.session_state.test_phase == "results":
         show_results_page()
+    
+    elif st.session_state.test_phase == "admin":
+        show_admin_page(question_bank)
 
 # ==================== 程序入口 ====================
 if __name__ == "__main__":